@@ -29,6 +29,10 @@ def create_app():
         SQL_ALCHEMY_DATABASE_URI = config.Config.SQL_ALCHEMY_DATABASE_URI
     app.config['SQLALCHEMY_DATABASE_URI'] = SQL_ALCHEMY_DATABASE_URI
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SIMILARITY_THRESHOLD'] = config.Config.SIMILARITY_THRESHOLD
+    for key in ['CACHE_BACKEND', 'CACHE_URL', 'CACHE_PREFIX', 'CACHE_TTL',
+                'CACHE_MAXSIZE']:
+        app.config[key] = getattr(config.Config, key)
 
     db.init_app(app)
     migrate.init_app(app, db)
@@ -40,6 +44,8 @@ def create_app():
         SSLify(app)
 
     from .models import User
+    from .cache import make_result_cache
+    app.extensions['result_cache'] = make_result_cache(app.config)
 
     @login_manager.user_loader
     def load_user(user_id):
@@ -48,6 +54,9 @@ def create_app():
     from .routes import main as main_blueprint
     app.register_blueprint(main_blueprint)
 
+    from .routes import api as api_blueprint
+    app.register_blueprint(api_blueprint)
+
     from .auth import auth as auth_blueprint
     app.register_blueprint(auth_blueprint)
 
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from .models import DatasetGeneration
+
+
+class LocalCache:
+    """In-process cache with a TTL per entry and LRU eviction"""
+
+    def __init__(self, maxsize: int=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires, value = self._data.pop(key)
+            except KeyError:
+                return None
+            if expires < time.monotonic():
+                return None
+            self._data[key] = (expires, value)
+            return value
+
+    def set(self, key, value, ttl: int) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + ttl, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Cache stored in Redis or any server speaking its protocol
+
+    Keys are prefixed with prefix, so the database can be shared and
+    clear() only removes this app's entries. Values are stored as JSON,
+    never pickled, since anyone able to write to a shared server could
+    otherwise run code in the app. Eviction is left to the server, e.g.
+    maxmemory-policy allkeys-lru.
+    """
+
+    def __init__(self, url: str, prefix: str='gugs_db'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = f'{prefix}:'
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def set(self, key, value, ttl: int) -> None:
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + '*', count=1000))
+        for i in range(0, len(keys), 1000):
+            self.client.delete(*keys[i:i + 1000])
+
+
+class ResultCache:
+    """Cache of rendered results invalidated whenever new data is loaded
+
+    Keys include the dataset generation that data/load_data.py bumps
+    after every load, so stale entries are simply never read again.
+    """
+
+    def __init__(self, backend, ttl: int=300, generation_ttl: int=5):
+        self.backend = backend
+        self.ttl = ttl
+        self.generation_ttl = generation_ttl
+        self.hits = 0
+        self.misses = 0
+        self._generation = None
+        self._generation_checked = 0.0
+
+    def generation(self) -> int:
+        now = time.monotonic()
+        if (self._generation is None
+                or now - self._generation_checked > self.generation_ttl):
+            self._generation = DatasetGeneration.current()
+            self._generation_checked = now
+        return self._generation
+
+    def key(self, prefix: str, params: dict) -> str:
+        normalized = {k: normalize(v) for k, v in params.items()}
+        digest = hashlib.sha1(
+            json.dumps(normalized, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f'{prefix}:{self.generation()}:{digest}'
+
+    def cached(self, prefix: str, params: dict, compute):
+        """Return the cached result for params or compute and store it
+
+        Only str and list results are stored, so redirects and flashed
+        errors are recomputed on every request.
+        """
+        key = self.key(prefix, params)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute()
+        if isinstance(value, (str, list)):
+            self.backend.set(key, value, self.ttl)
+        return value
+
+
+def normalize(value):
+    if isinstance(value, str):
+        return ' '.join(value.lower().split())
+    return value
+
+
+def make_result_cache(config) -> ResultCache:
+    if config['CACHE_BACKEND'] == 'redis':
+        backend = RedisCache(config['CACHE_URL'],
+                             prefix=config['CACHE_PREFIX'])
+    else:
+        backend = LocalCache(maxsize=config['CACHE_MAXSIZE'])
+    return ResultCache(backend, ttl=config['CACHE_TTL'])
+
+
+def result_cache() -> ResultCache:
+    return current_app.extensions['result_cache']
@@ -1,16 +1,20 @@
-from wtforms import Form, StringField, SelectField, IntegerField
+from wtforms import Form, StringField, SelectField, IntegerField, FloatField
 
 
 class RunnerSearchForm(Form):
     choices = [('Runner Name', 'Runner Name')]
     select = SelectField('Search for GUGS runners:', choices=choices)
     search = StringField('Search by runner name')
+    threshold = FloatField('Similarity threshold between 0 and 1 (default=0.3)')
+    limit = IntegerField('Maximum number of results (default=100)')
 
 
 class RunnerRaceSearchForm(Form):
     choices = [('Runner Name', 'Runner Name')]
     select = SelectField('Find races for a GUGS runner', choices=choices)
     search = StringField('Search by runner name')
+    threshold = FloatField('Similarity threshold between 0 and 1 (default=0.3)')
+    limit = IntegerField('Maximum number of results (default=100)')
 
 
 class TopRunnerForm(Form):
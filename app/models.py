@@ -1,5 +1,6 @@
 from flask_login import UserMixin
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import load_only
 
 from . import db
 
@@ -65,6 +66,34 @@ class RunnerContact(db.Model):
     postal_postal_code = db.Column(db.String)
     member_club_status = db.Column(db.String)
     club_name = db.Column(db.String)
+    # Hash of the exported row the contact was last synced from, see
+    # sync_runner_contacts in data/load_data.py
+    content_hash = db.Column(db.String(16))
+
+    # Column sets loaded for each view. Tables in app/tables.py show the
+    # same columns, everything else stays deferred.
+    PROFILES = {
+        'list': ['id', 'title', 'firstname', 'secondname', 'surname',
+                 'email', 'cellphone', 'club_name', 'member_club_status'],
+        'export': ['id', 'title', 'firstname', 'secondname', 'surname',
+                   'initials', 'birthdate', 'nationality', 'number', 'year',
+                   'timingchip', 'club_name', 'member_club_status'],
+        'detail': None,
+    }
+
+    @classmethod
+    def profile_query(cls, profile: str):
+        columns = cls.PROFILES[profile]
+        if columns is None:
+            return cls.query
+        return cls.query.options(load_only(*columns))
+
+    @classmethod
+    def profile_columns(cls, profile: str):
+        columns = cls.PROFILES[profile]
+        if columns is None:
+            return list(cls.__table__.columns)
+        return [cls.__table__.columns[c] for c in columns]
 
     @hybrid_property
     def fullname(self):
@@ -72,8 +101,12 @@ class RunnerContact(db.Model):
 
     @fullname.expression
     def fullname(cls):
-        return db.func.concat(
-            cls.firstname, ' ', cls.secondname, ' ', cls.surname
+        # Same result as concat(), but || is immutable so the trigram
+        # index on this expression can be used
+        return (
+            db.func.coalesce(cls.firstname, '') + ' '
+            + db.func.coalesce(cls.secondname, '') + ' '
+            + db.func.coalesce(cls.surname, '')
         )
 
 
@@ -103,3 +136,112 @@ class Race(db.Model):
 
     def __repr__(self):
         return '<Race %r>' % self.id
+
+
+class Prediction(db.Model):
+    __tablename__ = 'prediction'
+    __table_args__ = (
+        db.UniqueConstraint('name', 'distance_cat'),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    name = db.Column(db.String)
+    distance_cat = db.Column(db.String)
+    n_races = db.Column(db.Integer)
+    # Fingerprint of the race times the forecast was fitted on
+    history_hash = db.Column(db.String)
+    # Forecast and 95 % confidence interval in minutes
+    pred = db.Column(db.Float)
+    conf_lower = db.Column(db.Float)
+    conf_upper = db.Column(db.Float)
+    model_order = db.Column(db.String)
+    fit_seconds = db.Column(db.Float)
+    created = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return '<Prediction %r %r>' % (self.name, self.distance_cat)
+
+
+class Leaderboard(db.Model):
+    """Finishing times ranked per race, rebuilt from race after each load"""
+    __tablename__ = 'leaderboard'
+    __table_args__ = (
+        db.Index('ix_leaderboard_race_rank', 'race', 'race_rank',
+                 postgresql_include=['name', 'time_seconds']),
+        db.Index('ix_leaderboard_race_sex_rank', 'race', 'sex', 'sex_rank',
+                 postgresql_include=['name', 'time_seconds']),
+        db.Index('ix_leaderboard_pb', 'distance_cat', 'pb_rank',
+                 'time_seconds'),
+    )
+
+    # Same id as the race row
+    id = db.Column(db.BigInteger, primary_key=True)
+    runner_contact_id = db.Column(db.BigInteger)
+    pos = db.Column(db.Integer)
+    name = db.Column(db.String)
+    race = db.Column(db.String)
+    time = db.Column(db.Interval)
+    time_seconds = db.Column(db.Integer)
+    sex = db.Column(db.String)
+    distance_cat = db.Column(db.String)
+    race_year = db.Column(db.Integer)
+    # Rank within (race, distance_cat) and (race, sex, distance_cat)
+    race_rank = db.Column(db.Integer)
+    sex_rank = db.Column(db.Integer)
+    # Rank of this time among the runner's races in distance_cat
+    pb_rank = db.Column(db.Integer)
+
+    REFRESH_SQL = '''
+        INSERT INTO leaderboard (
+            id, runner_contact_id, pos, name, race, time, time_seconds,
+            sex, distance_cat, race_year, race_rank, sex_rank, pb_rank
+        )
+        SELECT id, runner_contact_id, pos, name, race, time,
+               extract(epoch FROM time)::integer,
+               sex, distance_cat, race_year,
+               row_number() OVER (PARTITION BY race, distance_cat
+                                  ORDER BY time, id),
+               row_number() OVER (PARTITION BY race, sex, distance_cat
+                                  ORDER BY time, id),
+               row_number() OVER (PARTITION BY name, distance_cat
+                                  ORDER BY time, id)
+        FROM race
+        WHERE time IS NOT NULL
+    '''
+
+    @classmethod
+    def refresh(cls):
+        """Rebuild the leaderboard from the race table in one statement"""
+        db.session.execute(db.text('DELETE FROM leaderboard'))
+        db.session.execute(db.text(cls.REFRESH_SQL))
+
+    def __repr__(self):
+        return '<Leaderboard %r>' % self.id
+
+
+class DatasetGeneration(db.Model):
+    """Counter bumped after every data load to invalidate cached results"""
+    __tablename__ = 'dataset_generation'
+
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.BigInteger, default=0)
+    updated = db.Column(db.DateTime)
+
+    @classmethod
+    def current(cls) -> int:
+        generation = db.session.query(cls.generation).filter_by(id=1).scalar()
+        return generation or 0
+
+    BUMP_SQL = db.text(
+        'INSERT INTO dataset_generation (id, generation, updated)'
+        ' VALUES (1, 1, now())'
+        ' ON CONFLICT (id) DO UPDATE'
+        ' SET generation = dataset_generation.generation + 1,'
+        ' updated = now()'
+    )
+
+    @classmethod
+    def bump(cls, con=None):
+        """Bump the generation, in con's transaction if given, for jobs
+        that run outside the app"""
+        (db.session if con is None else con).execute(cls.BUMP_SQL)
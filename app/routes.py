@@ -1,23 +1,27 @@
 import sys
+import json
+import datetime
+import decimal
 from os.path import dirname, abspath, join
 
 path = dirname(dirname(abspath(__file__)))
 sys.path.append(join(path, 'train'))
 
-from flask import request, render_template, make_response, flash, redirect, url_for
+from flask import request, render_template, flash, redirect, url_for
+from flask import Response, stream_with_context, jsonify, abort
 from flask import current_app as app
 from flask import Blueprint
 from flask_login import login_required, current_user
-from sqlalchemy.sql import func
-from sqlalchemy import or_, and_
-import pandas as pd
+from sqlalchemy import text
 
-from .models import db, RunnerContact, Race
+from .models import db, RunnerContact, Race, Leaderboard, Prediction
 from .forms import RunnerSearchForm, RunnerRaceSearchForm, TopRunnerForm, PredictForm
-from .tables import RunnerResults, RunnerRaceResults
+from .tables import RunnerResults, RunnerListResults, RunnerRaceResults, stream_table
+from .cache import result_cache
 from train import predict_runner
 
 main = Blueprint('main', __name__)
+api = Blueprint('api', __name__, url_prefix='/api')
 
 
 @main.route('/')
@@ -65,89 +69,226 @@ def top_runners_search():
     return render_template('search_top.html', title='GUGS DB', form=search)
 
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def keyset_page(qry, key_col, after=None, page_size=DEFAULT_PAGE_SIZE):
+    """Fetch one page of qry ordered by key_col, seeking past the key after"""
+    if after is not None:
+        qry = qry.filter(key_col > after)
+    return qry.order_by(key_col).limit(page_size).all()
+
+
+def keyset_batches(qry, key_col, page_size=DEFAULT_PAGE_SIZE):
+    """Walk through qry one keyset page at a time"""
+    after = None
+    while True:
+        page = keyset_page(qry, key_col, after, page_size)
+        if not page:
+            return
+        yield page
+        after = getattr(page[-1], key_col.key)
+
+
+def page_args():
+    after = request.args.get('after', type=int)
+    page_size = request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int)
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    stream = request.args.get('stream', 0, type=int) == 1
+    return after, page_size, stream
+
+
+def stream_template(template_name, **context):
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    rv = template.stream(context)
+    rv.enable_buffering(5)
+    return rv
+
+
+def render_results(qry, key_col, table_cls, endpoint, search_endpoint):
+    after, page_size, stream = page_args()
+
+    if stream:
+        rows = stream_table(table_cls, keyset_batches(qry, key_col, page_size))
+        return Response(stream_with_context(
+            stream_template('stream_results.html', rows=rows)
+        ))
+
+    results = keyset_page(qry, key_col, after, page_size)
+    if not results:
+        flash('No results found!')
+        return redirect(url_for(search_endpoint))
+
+    next_url = None
+    if len(results) == page_size:
+        next_url = url_for(endpoint,
+                           after=getattr(results[-1], key_col.key),
+                           page_size=page_size)
+    table = table_cls(results)
+    return render_template('race_results.html', table=table, next_url=next_url)
+
+
+def similar_to(col, search_string, threshold=None):
+    """Index-friendly trigram match, defaulting to the configured threshold"""
+    if threshold is None:
+        threshold = app.config['SIMILARITY_THRESHOLD']
+    threshold = max(0.0, min(threshold, 1.0))
+    # Same as SET LOCAL, so the threshold ends with the transaction
+    # instead of staying on the pooled connection
+    db.session.execute(
+        text("SELECT set_config('pg_trgm.similarity_threshold',"
+             ' :threshold, true)'),
+        {'threshold': str(threshold)}
+    )
+    return col.op('%')(search_string)
+
+
+def ranked_matches(qry, col, search_string, threshold=None, limit=None):
+    """The closest limit matches, found with the trigram index's <-> operator"""
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return (
+        qry.filter(similar_to(col, search_string, threshold))
+        .order_by(col.op('<->')(search_string))
+        .limit(limit).all()
+    )
+
+
+def render_matches(results, table_cls, search_endpoint):
+    if not results:
+        flash('No results found!')
+        return redirect(url_for(search_endpoint))
+    table = table_cls(results)
+    return render_template('race_results.html', table=table)
+
+
+def runner_results(search_string, threshold=None, limit=None):
+    qry = RunnerContact.profile_query('list')
+    if search_string:
+        results = ranked_matches(qry, RunnerContact.fullname,
+                                 search_string, threshold, limit)
+        return render_matches(results, RunnerListResults, 'main.search')
+    return render_results(qry, RunnerContact.id, RunnerListResults,
+                          'main.runner_list', 'main.search')
+
+
+def runner_race_results(search_string, threshold=None, limit=None):
+    if search_string:
+        def render():
+            results = ranked_matches(Race.query, Race.name,
+                                     search_string, threshold, limit)
+            return render_matches(results, RunnerRaceResults,
+                                  'main.runner_race_search')
+
+        params = {'search': search_string, 'threshold': threshold,
+                  'limit': limit}
+        return result_cache().cached('runner_race_results', params, render)
+    return render_results(Race.query, Race.id, RunnerRaceResults,
+                          'main.race_list', 'main.runner_race_search')
+
+
+def search_args():
+    return (request.args.get('q', ''),
+            request.args.get('threshold', type=float),
+            request.args.get('limit', type=int))
+
+
 @main.route('/results')
 def search_results(search):
-    results = []
     search_string = search.data['search']
+    if search.data['select'] != 'Runner Name':
+        search_string = ''
+    return runner_results(search_string, search.data['threshold'],
+                          search.data['limit'])
 
-    if search_string:
-        if search.data['select'] == 'Runner Name':
-            qry = RunnerContact.query.filter(
-                func.similarity(RunnerContact.fullname, search_string) >= 0.3
-            )
-            results = qry.all()
-        else:
-            results = RunnerContact.query.all()
-    else:
-        results = RunnerContact.query.all()
 
-    if not results:
-        flash('No results found!')
-        return redirect(url_for('main.search'))
-    else:
-        table = RunnerResults(results)
-        return render_template('results.html', table=table)
+@main.route('/runners')
+@login_required
+def runner_list():
+    return runner_results(*search_args())
+
+
+@main.route('/runners/<int:runner_id>')
+@login_required
+def runner_detail(runner_id):
+    runner = RunnerContact.profile_query('detail').get_or_404(runner_id)
+    table = RunnerResults([runner])
+    return render_template('race_results.html', table=table)
 
 
 @main.route('/runner_race_results')
 def search_runner_race_results(search):
-    results = []
     search_string = search.data['search']
+    if search.data['select'] != 'Runner Name':
+        search_string = ''
+    return runner_race_results(search_string, search.data['threshold'],
+                               search.data['limit'])
 
-    if search_string:
-        if search.data['select'] == 'Runner Name':
-            # TODO make the similarity strength configurable
-            # with the search term
-            qry = Race.query.filter(
-                func.similarity(Race.name, search_string) >= 0.3
-            )
-            results = qry.all()
-        else:
-            results = Race.query.all()
-    else:
-        results = Race.query.all()
 
-    if not results:
-        flash('No results found!')
-        return redirect(url_for('main.runner_race_search'))
-    else:
-        table = RunnerRaceResults(results)
-        return render_template('race_results.html', table=table)
+@main.route('/races')
+def race_list():
+    return runner_race_results(*search_args())
 
 
 @main.route('/top_runners')
 def top_runners(search):
-    results = []
     search_string = search.data['search']
     sex = search.data['select']
     n = search.data['n']
     if n is None:
         n = 10
 
-    if search_string:
-        if sex:
-            qry = (
-                db.session.query(Race)
-                .filter(Race.race.ilike(f'%{search_string}%'), Race.sex == sex)
-                .order_by(Race.time).limit(n)
-            )
-            # Change output from seconds to HH:MM:SS
-            for x in qry.all():
-                x.time = str(x.time)
-            results = qry.all()
+    def render():
+        results = []
+        races = []
+        if search_string:
+            # Resolve the matching race names first, so the ranks are read
+            # from the (race, race_rank) and (race, sex, sex_rank) indexes
+            races = [race for race, in db.session.query(
+                Leaderboard.race.distinct()
+            ).filter(Leaderboard.race.ilike(f'%{search_string}%'))]
+        if races:
+            qry = Leaderboard.query.filter(Leaderboard.race.in_(races))
+            if sex:
+                qry = qry.filter(Leaderboard.sex == sex,
+                                 Leaderboard.sex_rank <= n)
+            else:
+                qry = qry.filter(Leaderboard.race_rank <= n)
+            results = qry.order_by(Leaderboard.time_seconds).limit(n).all()
+
+        if not results:
+            flash('No results found!')
+            return redirect(url_for('main.top_runners_search'))
         else:
-            results = (
-                db.session.query(Race)
-                .filter(Race.race.ilike(f'%{search_string}%'))
-                .order_by(Race.time).limit(n)
-            )
+            table = RunnerRaceResults(results)
+            return render_template('race_results.html', table=table)
+
+    params = {'search': search_string, 'select': sex, 'n': n}
+    return result_cache().cached('top_runners', params, render)
+
+
+@main.route('/personal_bests')
+def personal_bests():
+    distance_cat = request.args.get('distance_cat')
+    sex = request.args.get('sex')
+    n = request.args.get('n', 10, type=int)
+    n = max(1, min(n, MAX_PAGE_SIZE))
+
+    qry = Leaderboard.query.filter(Leaderboard.pb_rank == 1)
+    if distance_cat:
+        qry = qry.filter(Leaderboard.distance_cat == distance_cat)
+    if sex:
+        qry = qry.filter(Leaderboard.sex == sex)
+    results = qry.order_by(Leaderboard.time_seconds).limit(n).all()
 
     if not results:
         flash('No results found!')
         return redirect(url_for('main.top_runners_search'))
-    else:
-        table = RunnerRaceResults(results)
-        return render_template('race_results.html', table=table)
+    table = RunnerRaceResults(results)
+    return render_template('race_results.html', table=table)
 
 
 @main.route('/predict', methods=['GET', 'POST'])
@@ -156,10 +297,12 @@ def predict_race_time():
     result = ''
     if request.method == 'POST':
         name = search.data['search']
-        df = pd.read_sql(db.session.query(Race).statement, con=db.engine)
 
         if name:
-            result = predict_runner(name, df)
+            result = result_cache().cached(
+                'predict', {'search': name},
+                lambda: predict_runner(name, con=db.engine)
+            )
         else:
             flash('Please enter a name')
 
@@ -171,3 +314,76 @@ def predict_race_time():
                            title='Gugs DB',
                            form=search,
                            result=result)
+
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def to_json_value(value):
+    if isinstance(value, datetime.timedelta):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def row_to_dict(row, columns):
+    return {col.key: to_json_value(getattr(row, col.key)) for col in columns}
+
+
+def stream_ndjson(qry, columns):
+
+    def generate():
+        for row in qry.yield_per(EXPORT_BATCH_SIZE):
+            yield json.dumps(row_to_dict(row, columns)) + '\n'
+
+    return Response(stream_with_context(generate()),
+                    mimetype='application/x-ndjson')
+
+
+@api.route('/races.ndjson')
+def export_races():
+    qry = Race.query
+    name = request.args.get('name')
+    race = request.args.get('race')
+    if name:
+        qry = qry.filter(Race.name.ilike(f'%{name}%'))
+    if race:
+        qry = qry.filter(Race.race.ilike(f'%{race}%'))
+    for key in ['sex', 'distance_cat']:
+        value = request.args.get(key)
+        if value:
+            qry = qry.filter(getattr(Race, key) == value)
+    race_year = request.args.get('race_year', type=int)
+    if race_year is not None:
+        qry = qry.filter(Race.race_year == race_year)
+    return stream_ndjson(qry.order_by(Race.id), Race.__table__.columns)
+
+
+@api.route('/runners.ndjson')
+@login_required
+def export_runners():
+    qry = RunnerContact.profile_query('export')
+    name = request.args.get('name')
+    club_name = request.args.get('club_name')
+    if name:
+        qry = qry.filter(RunnerContact.fullname.ilike(f'%{name}%'))
+    if club_name:
+        qry = qry.filter(RunnerContact.club_name.ilike(f'%{club_name}%'))
+    return stream_ndjson(qry.order_by(RunnerContact.id),
+                         RunnerContact.profile_columns('export'))
+
+
+@api.route('/predictions')
+def export_predictions():
+    name = request.args.get('name')
+    if not name:
+        abort(400, 'Please provide a runner name')
+    columns = Prediction.__table__.columns
+    results = (
+        Prediction.query.filter(Prediction.name.ilike(f'%{name}%'))
+        .order_by(Prediction.name, Prediction.distance_cat).all()
+    )
+    return jsonify([row_to_dict(row, columns) for row in results])
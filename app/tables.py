@@ -1,4 +1,6 @@
+from markupsafe import Markup
 from flask_table import Table, Col, DateCol
+from flask_table.html import _format_attrs
 
 
 class RunnerResults(Table):
@@ -51,6 +53,19 @@ class RunnerResults(Table):
     club_name = Col('club_name')
 
 
+class RunnerListResults(Table):
+    """Columns of the RunnerContact 'list' profile"""
+    id = Col('Id', show=False)
+    title = Col('title')
+    firstname = Col('firstname')
+    secondname = Col('secondname')
+    surname = Col('surname')
+    email = Col('email')
+    cellphone = Col('cellphone')
+    club_name = Col('club_name')
+    member_club_status = Col('member_club_status')
+
+
 class RunnerRaceResults(Table):
     classes =  ['table', 'table-striped', 'table-condensed']
     id = Col('id', show=False)
@@ -60,3 +75,18 @@ class RunnerRaceResults(Table):
     race = Col('race')
     time = Col('time')
     sex = Col('sex')
+
+
+def stream_table(table_cls, batches):
+    """Yield the html of a flask_table one batch of rows at a time
+
+    Arguments:
+        table_cls {Table} -- the flask_table class used to render rows
+        batches {iterable} -- an iterable of lists of row objects
+    """
+    table = table_cls([])
+    yield Markup('<table{}>\n{}\n<tbody>\n'.format(
+        _format_attrs(table.get_html_attrs()), table.thead()))
+    for batch in batches:
+        yield Markup('\n'.join(table.tr(item) for item in batch))
+    yield Markup('\n</tbody>\n</table>')
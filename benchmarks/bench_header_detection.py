@@ -0,0 +1,75 @@
+"""Time row-by-row and vectorized header detection on a large sheet
+
+Run from the repository root with
+
+    python -m benchmarks.bench_header_detection [--rows N]
+"""
+import argparse
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+
+from data.load_db_excel import (REGEX, GUGS_VARIANTS, find_str,
+                                scan_sheet)
+
+
+def make_raw_sheet(n_rows: int) -> pd.DataFrame:
+    # A few title rows, a header and n_rows finishers, as read with header=None
+    rng = np.random.default_rng(0)
+    clubs = np.array(['RCS Gugulethu', 'Other AC', 'Harriers', None],
+                     dtype=object)
+    body = pd.DataFrame({
+        0: np.arange(1, n_rows + 1),
+        1: [f'Runner {i}' for i in range(n_rows)],
+        2: [datetime.time(1, i % 60, i % 60) for i in range(n_rows)],
+        3: rng.choice(['M', 'F'], n_rows),
+        4: clubs[rng.integers(0, len(clubs), n_rows)],
+    })
+    top = pd.DataFrame([['Synthetic 10km', None, None, None, None],
+                        [None, None, None, None, None],
+                        ['Pos', 'Name', 'Time', 'Sex', 'Club']])
+    return pd.concat([top, body], ignore_index=True)
+
+
+def legacy_scan(raw: pd.DataFrame):
+    # What find_race_sheets, find_header and compile_gugs_data used to do
+    match_count = raw.apply(find_str, args=(REGEX,), axis=1).sum()
+    s = raw.iloc[:21].apply(find_str, args=(REGEX,), axis=1)
+    header = s.idxmax()
+    df = raw.iloc[header + 1:]
+    df.columns = raw.iloc[header]
+    gugs = df['Club'].str.contains(GUGS_VARIANTS, case=False, na=False)
+    return match_count, header, gugs.sum()
+
+
+def timed(func, *args, repeat: int=3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+',
+                        default=[1000, 5000, 20000])
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        raw = make_raw_sheet(n_rows)
+        scan = scan_sheet(raw)
+        assert scan.header == legacy_scan(raw)[1]
+        assert scan.gugs_rows.sum() == legacy_scan(raw)[2]
+        legacy = timed(legacy_scan, raw)
+        vectorized = timed(scan_sheet, raw)
+        print(f'{n_rows:>6} rows: row by row {legacy:.3f}s,'
+              f' vectorized {vectorized:.3f}s'
+              f' ({legacy / vectorized:.0f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Time each ingest stage on generated WPA-style result files
+
+Run from the repository root with
+
+    python -m benchmarks.bench_ingest [--rows N ...] [--out results.json]
+
+find_race_sheets (read_csv_results for CSV and TSV files),
+compile_gugs_data, clean_time and fix_distances are timed on every
+generated file. With --database, load_df_orm is timed as well against
+the TestConfig database, loading into race_year BENCH_YEAR and removing
+the rows again afterwards.
+
+Results are written as JSON. Compare two runs, e.g. before and after a
+change, with
+
+    python -m benchmarks.bench_ingest --compare old.json new.json
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.wpa_workbooks import make_specs, write_spec
+from data.load_db_excel import (CSV_SUFFIXES, find_race_sheets,
+                                read_csv_results, compile_gugs_data,
+                                normalize_results, clean_time)
+from data.load_data import clean_race_df, fix_distances, load_df_orm
+
+
+BENCH_YEAR = 1900
+
+
+def timed(func, *args, repeat: int=3):
+    """Best wall time of repeat calls, and the result of the last one"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def read_sheets(path: Path) -> list:
+    if path.suffix.lower() in CSV_SUFFIXES:
+        return read_csv_results(path)
+    with pd.ExcelFile(path) as xl:
+        return find_race_sheets(xl)
+
+
+def load_races(df: pd.DataFrame) -> None:
+    from app import db
+    from app.models import Race
+    load_df_orm(df, Race)
+    Race.query.filter_by(race_year=BENCH_YEAR).delete()
+    db.session.commit()
+
+
+def bench_file(path: Path, n_rows: int, repeat: int=3,
+               database: bool=False) -> list:
+    results = []
+
+    def record(stage, seconds, rows):
+        results.append({
+            'file': path.name,
+            'format': path.suffix.lstrip('.'),
+            'field_size': n_rows,
+            'stage': stage,
+            'rows': rows,
+            'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds else None,
+        })
+
+    read_stage = ('read_csv_results' if path.suffix.lower() in CSV_SUFFIXES
+                  else 'find_race_sheets')
+    seconds, sheets = timed(read_sheets, path, repeat=repeat)
+    record(read_stage, seconds, sum(len(df) for _, df in sheets))
+
+    seconds, (compiled, _) = timed(compile_gugs_data, {path.stem: sheets},
+                                   repeat=repeat)
+    record('compile_gugs_data', seconds, sum(len(df) for _, df in sheets))
+
+    races = normalize_results(compiled)
+    seconds, races = timed(clean_time, races, repeat=repeat)
+    record('clean_time', seconds, len(races))
+
+    races = clean_race_df(races, BENCH_YEAR)
+    seconds, races = timed(fix_distances, races, repeat=repeat)
+    record('fix_distances', seconds, len(races))
+
+    if database:
+        seconds, _ = timed(load_races, races, repeat=1)
+        record('load_df_orm', seconds, len(races))
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: list, repeat: int=3, database: bool=False,
+        seed: int=0) -> dict:
+    if database:
+        from app import create_app, db
+        app = create_app()
+        app.config.from_object('config.TestConfig')
+        app.app_context().push()
+        db.create_all()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for spec in make_specs(sizes, seed):
+            path = write_spec(spec, Path(tmp))
+            print(f'{path.name}: {spec.n_rows} rows x {spec.n_sheets} sheets,'
+                  f' {spec.time_format} times')
+            results += bench_file(path, spec.n_rows, repeat=repeat,
+                                  database=database)
+    return {
+        'revision': git_revision(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'repeat': repeat,
+        'seed': seed,
+        'results': results,
+    }
+
+
+def compare(old: dict, new: dict) -> None:
+    def key(r):
+        return r['file'], r['stage']
+    before = {key(r): r['seconds'] for r in old['results']}
+    print(f"{'file':<24}{'stage':<20}{old['revision'] or 'old':>10}"
+          f"{new['revision'] or 'new':>10}{'ratio':>8}")
+    for r in new['results']:
+        if key(r) not in before:
+            continue
+        ratio = r['seconds'] / before[key(r)] if before[key(r)] else 0
+        print(f"{r['file']:<24}{r['stage']:<20}{before[key(r)]:>10.4f}"
+              f"{r['seconds']:>10.4f}{ratio:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+',
+                        default=[100, 1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database', action='store_true',
+                        help='Also time load_df_orm against the test database')
+    parser.add_argument('--out', type=Path,
+                        default=Path('benchmarks') / 'ingest_results.json')
+    parser.add_argument('--compare', type=Path, nargs=2,
+                        metavar=('OLD', 'NEW'),
+                        help='Print stage times of two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        old, new = (json.loads(path.read_text()) for path in args.compare)
+        compare(old, new)
+        return
+
+    report = run(args.rows, repeat=args.repeat, database=args.database,
+                 seed=args.seed)
+    args.out.write_text(json.dumps(report, indent=1))
+    for r in report['results']:
+        print(f"{r['file']:<24}{r['stage']:<20}{r['rows']:>7} rows"
+              f"{r['seconds']:>9.4f}s")
+    print(f'Results written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Compare Excel parser passes of the old and new sheet readers
+
+Run from the repository root with
+
+    python -m benchmarks.bench_sheet_reader [workbook ...]
+
+Without arguments a synthetic three sheet workbook is generated.
+"""
+import argparse
+import datetime
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from data.load_db_excel import REGEX, find_str, find_race_sheets
+
+
+class ParseCounter:
+    """Counts pd.read_excel calls and the sheets each one parses"""
+
+    def __init__(self):
+        self.calls = 0
+        self.sheets = 0
+        self._read_excel = pd.read_excel
+
+    def __enter__(self):
+        def counting_read_excel(io, sheet_name=0, **kwargs):
+            result = self._read_excel(io, sheet_name=sheet_name, **kwargs)
+            self.calls += 1
+            self.sheets += len(result) if isinstance(result, dict) else 1
+            return result
+        pd.read_excel = counting_read_excel
+        return self
+
+    def __exit__(self, *exc):
+        pd.read_excel = self._read_excel
+
+
+def legacy_read_pattern(xl: pd.ExcelFile) -> None:
+    # The reads find_race_sheets and load_excel used to make per sheet
+    for sheet in xl.sheet_names:
+        df = pd.read_excel(xl, sheet_name=sheet)
+        if df.apply(find_str, args=(REGEX,), axis=1).sum() + \
+                find_str(df.columns, REGEX) > 0:
+            head = pd.read_excel(xl, sheet, nrows=20)
+            s = head.apply(find_str, args=(REGEX,), axis=1)
+            start = head.loc[s].index.values[0] + 1 if s.any() else 0
+            pd.read_excel(xl, sheet, header=start)
+
+
+def make_workbook(path: Path, n_rows: int=2000) -> Path:
+    results = pd.DataFrame({
+        'Pos': range(1, n_rows + 1),
+        'Name': [f'Runner {i}' for i in range(n_rows)],
+        'Time': [datetime.time(1, i % 60, i % 60) for i in range(n_rows)],
+        'Club': ['RCS Gugulethu' if i % 10 == 0 else 'Other AC'
+                 for i in range(n_rows)],
+    })
+    with pd.ExcelWriter(path) as writer:
+        for sheet in ['10km', '21km']:
+            pd.DataFrame([['Synthetic race results']]).to_excel(
+                writer, sheet_name=sheet, header=False, index=False)
+            results.to_excel(writer, sheet_name=sheet, startrow=2, index=False)
+        pd.DataFrame({'Sponsors': ['A', 'B']}).to_excel(
+            writer, sheet_name='notes', index=False)
+    return path
+
+
+def bench(workbook: Path) -> dict:
+    report = {'workbook': workbook.name}
+    for label, func in [('legacy', legacy_read_pattern),
+                        ('single_pass', find_race_sheets)]:
+        xl = pd.ExcelFile(workbook)
+        with ParseCounter() as counter:
+            start = time.perf_counter()
+            func(xl)
+            report[f'{label}_seconds'] = time.perf_counter() - start
+        report[f'{label}_sheet_parses'] = counter.sheets
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('workbooks', nargs='*', type=Path)
+    args = parser.parse_args()
+
+    workbooks = args.workbooks
+    if not workbooks:
+        tmp = Path(tempfile.mkdtemp())
+        workbooks = [make_workbook(tmp / 'synthetic.xlsx')]
+
+    for workbook in workbooks:
+        report = bench(workbook)
+        print(f"{report['workbook']}: "
+              f"{report['legacy_sheet_parses']} sheet parses in "
+              f"{report['legacy_seconds']:.2f}s before, "
+              f"{report['single_pass_sheet_parses']} in "
+              f"{report['single_pass_seconds']:.2f}s now")
+
+
+if __name__ == '__main__':
+    main()
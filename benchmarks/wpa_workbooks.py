@@ -0,0 +1,178 @@
+"""Synthetic result files shaped like the ones on the WPA results page
+
+Run from the repository root with
+
+    python -m benchmarks.wpa_workbooks OUT_DIR [--rows N ...]
+
+to write a month folder of generated workbooks and CSVs, laid out like
+data/Race_downloads/<year>/<month>.
+"""
+import argparse
+import datetime
+from pathlib import Path
+from typing import NamedTuple, List
+
+import numpy as np
+import pandas as pd
+
+
+CLUB_COLS = ['Club', 'TeamName', 'CLUB', 'Club Name']
+TIME_COLS = ['Time', 'Finish', 'NetTime', 'Gun Finish', 'Elapsed_Time',
+             'Finish Time']
+NAME_COLS = [['Name', 'Surname'], ['FirstName', 'LastName'],
+             ['First Name', 'Last Name'], ['Participant']]
+# Encodings finish times turn up in, see data/finish_times.py
+TIME_FORMATS = ['hms', 'h_ms', 'ms', 'time', 'datetime', 'fraction',
+                'dotted']
+CLUBS = ['RCS Gugulethu', 'Gugs AC', 'Gugulethu', 'Harriers', 'Other AC',
+         'Celtic Harriers', 'Temp Licence', None]
+RACE_SHEETS = ['10km', '21km', '42km', '5km', '15km']
+
+
+class WorkbookSpec(NamedTuple):
+    name: str
+    n_rows: int
+    fmt: str = 'xlsx'
+    n_sheets: int = 1
+    title_rows: int = 2
+    club_col: str = 'Club'
+    time_col: str = 'Time'
+    name_cols: tuple = ('Name', 'Surname')
+    time_format: str = 'hms'
+    footer: bool = True
+    gugs_share: float = 0.1
+    seed: int = 0
+
+
+def make_specs(sizes: List[int], seed: int=0) -> List[WorkbookSpec]:
+    """One spec per size and file format, with the layout varied at random
+
+    Race fields of 10,000 rows and more get a single sheet to keep
+    generation time reasonable.
+    """
+    rng = np.random.default_rng(seed)
+    specs = []
+    for n_rows in sizes:
+        for fmt in ['xlsx', 'csv', 'tsv']:
+            n_sheets = 1
+            if fmt == 'xlsx' and n_rows < 10000:
+                n_sheets = int(rng.integers(1, 4))
+            specs.append(WorkbookSpec(
+                name=f'synthetic{n_rows}{fmt}',
+                n_rows=n_rows,
+                fmt=fmt,
+                n_sheets=n_sheets,
+                title_rows=int(rng.integers(0, 6)),
+                club_col=str(rng.choice(CLUB_COLS)),
+                time_col=str(rng.choice(TIME_COLS)),
+                name_cols=tuple(NAME_COLS[rng.integers(len(NAME_COLS))]),
+                time_format=str(rng.choice(TIME_FORMATS)),
+                footer=bool(rng.integers(2)),
+                seed=int(rng.integers(1 << 31)),
+            ))
+    return specs
+
+
+def format_times(seconds: np.ndarray, time_format: str) -> list:
+    h, rest = np.divmod(seconds, 3600)
+    m, s = np.divmod(rest, 60)
+    if time_format == 'hms':
+        return [f'{a:02d}:{b:02d}:{c:02d}' for a, b, c in zip(h, m, s)]
+    elif time_format == 'h_ms':
+        return [f'{a}:{b:02d}:{c:02d}' for a, b, c in zip(h, m, s)]
+    elif time_format == 'ms':
+        # MM:SS for times under an hour, as parse_times rejects minutes
+        # past 59, and H:MM:SS for longer ones
+        return [f'{b}:{c:02d}' if a == 0 else f'{a}:{b:02d}:{c:02d}'
+                for a, b, c in zip(h, m, s)]
+    elif time_format == 'time':
+        return [datetime.time(a, b, c) for a, b, c in zip(h, m, s)]
+    elif time_format == 'datetime':
+        return [datetime.datetime(1900, 1, 1, a, b, c)
+                for a, b, c in zip(h, m, s)]
+    elif time_format == 'fraction':
+        return [f'{a:02d}:{b:02d}:{c:02d}.{i % 1000:03d}'
+                for i, (a, b, c) in enumerate(zip(h, m, s))]
+    elif time_format == 'dotted':
+        return [f'{a}.{b:02d}.{c:02d}' for a, b, c in zip(h, m, s)]
+    raise ValueError(f'Unknown time format {time_format}')
+
+
+def make_results(spec: WorkbookSpec, sheet: int=0) -> pd.DataFrame:
+    rng = np.random.default_rng(spec.seed + sheet)
+    n = spec.n_rows
+    seconds = np.sort(rng.integers(15 * 60, 6 * 3600, n))
+    times = format_times(seconds, spec.time_format)
+    # A few finishers without a time, as in real files
+    for i in rng.choice(n, size=n // 50, replace=False):
+        times[i] = rng.choice(['DNF', None, 'not started'])
+
+    clubs = np.array(CLUBS, dtype=object)
+    weights = np.array([spec.gugs_share / 3] * 3
+                       + [(1 - spec.gugs_share) / (len(CLUBS) - 3)]
+                       * (len(CLUBS) - 3))
+    df = pd.DataFrame({'Pos': np.arange(1, n + 1)})
+    for i, col in enumerate(spec.name_cols):
+        df[col] = [f'Runner{i} {j}' for j in rng.integers(0, n * 2, n)]
+    df[spec.time_col] = times
+    df['Sex'] = rng.choice(['M', 'F'], n)
+    df['Age'] = rng.integers(18, 80, n)
+    df['Cat'] = rng.choice(['SEN', 'VET', 'MAS', 'GM'], n)
+    df['Lic No'] = [f'WP{x}' if x % 7 == 0 else str(x)
+                    for x in rng.integers(1000, 99999, n)]
+    df[spec.club_col] = rng.choice(clubs, n, p=weights)
+    return df
+
+
+def sheet_rows(spec: WorkbookSpec, sheet: int=0) -> pd.DataFrame:
+    """The sheet as read with header=None: titles, header, results, footer"""
+    results = make_results(spec, sheet)
+    width = results.shape[1]
+    title = [[f'{spec.name} {RACE_SHEETS[sheet % len(RACE_SHEETS)]}']
+             + [None] * (width - 1)]
+    title += [[None] * width] * max(spec.title_rows - 1, 0)
+    rows = title[:spec.title_rows]
+    rows.append(results.columns.to_list())
+    rows += results.to_numpy().tolist()
+    if spec.footer:
+        rows += [[None] * width,
+                 ['Results by Synthetic Timing'] + [None] * (width - 1)]
+    return pd.DataFrame(rows)
+
+
+def write_spec(spec: WorkbookSpec, folder: Path) -> Path:
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f'{spec.name}.{spec.fmt}'
+    if spec.fmt in ('csv', 'tsv'):
+        sep = '\t' if spec.fmt == 'tsv' else ','
+        sheet_rows(spec).to_csv(path, sep=sep, header=False, index=False)
+        return path
+    with pd.ExcelWriter(path) as writer:
+        for i in range(spec.n_sheets):
+            sheet_rows(spec, i).to_excel(
+                writer, sheet_name=RACE_SHEETS[i % len(RACE_SHEETS)],
+                header=False, index=False)
+        pd.DataFrame({'Sponsors': ['A', 'B']}).to_excel(
+            writer, sheet_name='notes', index=False)
+    return path
+
+
+def write_month(specs: List[WorkbookSpec], folder: Path) -> List[Path]:
+    return [write_spec(spec, folder) for spec in specs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out_dir', type=Path)
+    parser.add_argument('--rows', type=int, nargs='+',
+                        default=[100, 1000, 10000, 50000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for path in write_month(make_specs(args.rows, args.seed),
+                            args.out_dir / 'synthetic'):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,15 @@ class Config:
     database = os.getenv('POSTGRES_DB')
     port = os.getenv('POSTGRES_PORT')
     SQL_ALCHEMY_DATABASE_URI = f'postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}'
+    # Threshold for the pg_trgm % operator used by name searches
+    SIMILARITY_THRESHOLD = float(os.getenv('SIMILARITY_THRESHOLD', '0.3'))
+    # Search result cache, 'local' (in-process) or 'redis'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'local')
+    CACHE_URL = os.getenv('CACHE_URL', 'redis://localhost:6379/0')
+    # Namespace of the cache keys in a shared Redis database
+    CACHE_PREFIX = os.getenv('CACHE_PREFIX', 'gugs_db')
+    CACHE_TTL = int(os.getenv('CACHE_TTL', '300'))
+    CACHE_MAXSIZE = int(os.getenv('CACHE_MAXSIZE', '1024'))
 
 
 class TestConfig(Config):
@@ -0,0 +1,75 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+RULES_PATH = Path(__file__).resolve().parent / 'distance_rules.json'
+
+
+def load_rules(path: Path=RULES_PATH) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def override_mask(rule: dict, columns: dict) -> np.ndarray:
+    mask = np.ones(len(columns['race']), dtype=bool)
+    for key in ['race', 'name', 'sheet', 'year']:
+        if key in rule:
+            mask &= (columns[key] == rule[key]).to_numpy()
+    for key in ['race', 'name', 'sheet']:
+        pattern = rule.get(f'{key}_pattern')
+        if pattern is not None:
+            mask &= columns[key].str.contains(pattern, na=False).to_numpy()
+    return mask
+
+
+def resolve_distances(df: pd.DataFrame, rules: dict=None) -> pd.DataFrame:
+    """Set distance_km and distance_cat from the race names and rule table
+
+    The first rule that applies to a row wins, in this order:
+    explicit overrides from the rule table, a sheet name alias, a
+    distance at the start of the sheet name (e.g. 21km), a distance
+    anywhere in the race name, then the default distance. Overrides
+    match on race, name, sheet and year, so a runner's distance in one
+    race is given by both, never by the row's position.
+
+    Arguments:
+        df {pd.DataFrame} -- races with race (book_sheet) and name columns
+        rules {dict} -- rule table, distance_rules.json by default
+    """
+    if rules is None:
+        rules = load_rules()
+    df = df.copy()
+    race = df['race'].astype(str).str.lower()
+    columns = {
+        'race': race,
+        'name': df['name'].astype(str).str.lower(),
+        'sheet': race.str.split('_').str[1].fillna(''),
+        'year': (df['race_year'] if 'race_year' in df
+                 else pd.Series(np.nan, index=df.index)),
+    }
+
+    conditions = []
+    choices = []
+    for rule in rules['overrides']:
+        conditions.append(override_mask(rule, columns))
+        choices.append(np.full(len(df), rule['km'], dtype=float))
+
+    alias_km = columns['sheet'].map(rules['sheet_aliases']).to_numpy(dtype=float)
+    sheet_km = pd.to_numeric(
+        columns['sheet'].str.extract(r'^(\d+(?:\.\d+)?)', expand=False)
+    ).to_numpy(dtype=float)
+    race_km = pd.to_numeric(
+        race.str.extract(r'(\d{1,2})km', expand=False)
+    ).to_numpy(dtype=float)
+    for km in [alias_km, sheet_km, race_km]:
+        conditions.append(~np.isnan(km))
+        choices.append(km)
+
+    distance_km = np.select(conditions, choices, default=rules['default_km'])
+    df['distance_km'] = np.floor(distance_km).astype(int)
+    df['distance_cat'] = pd.cut(df.distance_km, rules['bins'],
+                                include_lowest=True).astype(str)
+    return df
@@ -0,0 +1,93 @@
+import re
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Finish time encodings seen in the WPA result files. Each pattern must
+# match the whole cleaned value. Groups h, m and s are hours, minutes
+# and seconds; the dotted three part form uses a, b and c because its
+# meaning depends on the size of the first number.
+TIME_PATTERNS = [
+    # Excel datetimes such as 1900-01-01 01:02:03, only the time of day
+    # is kept
+    ('datetime', r'\d{4}-\d{2}-\d{2}[ T](?P<h>\d{1,2}):(?P<m>\d{2}):(?P<s>\d{2})(?:\.\d+)?'),
+    # Excel [h]:mm:ss cells, read as timedeltas and written as text like
+    # 0 days 01:02:03 (or 1 day, 1:02:03 for datetime.timedelta)
+    ('timedelta', r'(?P<d>\d+) days?,? (?P<h>\d{1,2}):(?P<m>\d{2}):(?P<s>\d{2})(?:\.\d+)?'),
+    # H:MM:SS and HH:MM:SS, optionally with fractions of a second
+    ('hms', r'(?P<h>\d{1,2}):(?P<m>\d{2}):(?P<s>\d{2})(?:[.,]\d+)?'),
+    # MM:SS
+    ('ms', r'(?P<m>\d{1,2}):(?P<s>\d{2})(?:\.\d+)?'),
+    # Race walking files: H.MM.SS, or MM.SS.hh when the first part is
+    # more than 20
+    ('dotted_hms', r'(?P<a>\d{1,2})\.(?P<b>\d{2})\.(?P<c>\d{2})'),
+    # MM.SS
+    ('dotted_ms', r'(?P<m>\d{1,2})\.(?P<s>\d{2})'),
+]
+
+# Values that mean there is no finish time, as opposed to a time that
+# could not be read
+MISSING_TIMES = ['', 'nan', 'none', 'nat', 'not started', '99:99:99']
+
+
+def compile_patterns(patterns: list) -> re.Pattern:
+    """Join the patterns into one regex, prefixing each group name"""
+    alternatives = []
+    for name, pattern in patterns:
+        pattern = pattern.replace('(?P<', f'(?P<{name}_')
+        alternatives.append(f'(?P<{name}>{pattern})')
+    return re.compile('^(?:' + '|'.join(alternatives) + ')$')
+
+
+TIME_REGEX = compile_patterns(TIME_PATTERNS)
+
+
+def parse_times(values: pd.Series) -> Tuple[pd.Series, int]:
+    """Parse raw finish times into timedeltas in one vectorized pass
+
+    Arguments:
+        values {pd.Series} -- raw time column as read from the sheets
+
+    Returns:
+        (pd.Series, int) -- timedelta64 times, NaT where there is no time,
+            and the number of values that could not be parsed
+    """
+    text = values.astype(str).str.strip()
+    parts = text.str.extract(TIME_REGEX)
+
+    def group(name):
+        return pd.to_numeric(parts[name], errors='coerce').to_numpy()
+
+    hours = np.full(len(text), np.nan)
+    minutes = np.full(len(text), np.nan)
+    seconds = np.full(len(text), np.nan)
+    for name in ['datetime', 'timedelta', 'hms', 'ms', 'dotted_ms']:
+        matched = parts[name].notna().to_numpy()
+        hours[matched] = (group(f'{name}_h')[matched]
+                          if f'{name}_h' in parts else 0)
+        minutes[matched] = group(f'{name}_m')[matched]
+        seconds[matched] = group(f'{name}_s')[matched]
+    matched = parts['timedelta'].notna().to_numpy()
+    hours[matched] += 24 * group('timedelta_d')[matched]
+
+    matched = parts['dotted_hms'].notna().to_numpy()
+    a, b, c = (group(f'dotted_hms_{g}') for g in 'abc')
+    minutes_first = matched & (a > 20)
+    hours_first = matched & ~(a > 20)
+    hours[minutes_first] = 0
+    minutes[minutes_first] = a[minutes_first]
+    seconds[minutes_first] = b[minutes_first]
+    hours[hours_first] = a[hours_first]
+    minutes[hours_first] = b[hours_first]
+    seconds[hours_first] = c[hours_first]
+
+    total = hours * 3600 + minutes * 60 + seconds
+    total[(minutes >= 60) | (seconds >= 60)] = np.nan
+    missing = (values.isna() | text.str.lower().isin(MISSING_TIMES)).to_numpy()
+    n_unparsed = int((np.isnan(total) & ~missing).sum())
+    total[missing] = np.nan
+
+    times = pd.Series(pd.to_timedelta(total, unit='s'), index=values.index)
+    return times, n_unparsed
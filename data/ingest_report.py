@@ -0,0 +1,100 @@
+import datetime
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class StageStats:
+    """Totals for one pipeline stage over every call in a run"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes = 0
+
+    def merge(self, other: 'StageStats') -> None:
+        self.calls += other.calls
+        self.seconds += other.seconds
+        self.rows_in += other.rows_in
+        self.rows_out += other.rows_out
+        self.bytes += other.bytes
+
+    def to_dict(self) -> dict:
+        return {'calls': self.calls,
+                'seconds': round(self.seconds, 4),
+                'rows_in': self.rows_in,
+                'rows_out': self.rows_out,
+                'bytes': self.bytes}
+
+
+class IngestReport:
+    """Wall time, row counts and rejected data for each stage of an ingest
+
+    Stages are timed with
+
+        with report.stage('clean_time') as stage:
+            stage.rows_in += len(df)
+            ...
+
+    and anything dropped along the way is recorded with report.reject.
+    Stages can nest, e.g. extract includes find_race_sheets.
+    Workbooks parsed in worker processes get a report of their own,
+    which is merged into the parent one. write() saves the whole run as
+    JSON.
+    """
+
+    def __init__(self):
+        self.started = datetime.datetime.now()
+        self.stages = {}
+        self.rejections = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        stats = StageStats()
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.calls += 1
+            stats.seconds = time.perf_counter() - start
+            self.stages.setdefault(name, StageStats()).merge(stats)
+
+    def reject(self, stage: str, reason: str, source: str, rows: int=1,
+               detail: str=None) -> None:
+        """Record rows (or a whole sheet or file) dropped by a stage"""
+        self.rejections.append({'stage': stage, 'reason': reason,
+                                'source': source, 'rows': int(rows),
+                                'detail': detail})
+
+    def merge(self, other: 'IngestReport') -> None:
+        for name, stats in other.stages.items():
+            self.stages.setdefault(name, StageStats()).merge(stats)
+        self.rejections += other.rejections
+
+    def rejected_by_reason(self) -> dict:
+        counts = Counter()
+        for rejection in self.rejections:
+            counts[rejection['reason']] += rejection['rows']
+        return dict(counts)
+
+    def to_dict(self) -> dict:
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'seconds': round(time.perf_counter() - self._start, 4),
+            'stages': {name: stats.to_dict()
+                       for name, stats in self.stages.items()},
+            'rejected_rows': self.rejected_by_reason(),
+            'rejections': self.rejections,
+        }
+
+    def write(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1, default=str)
+        print(f'Ingest report written to {path}')
@@ -14,14 +14,22 @@ import pandas as pd
 import numpy as np
 from sqlalchemy.sql import func
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert
 from werkzeug.security import generate_password_hash
 import datetime
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from dotenv import load_dotenv
 import argparse
 
 from app import db, create_app
-from app.models import RunnerContact, User, Race
-from data.load_db_excel import scrape_all, append_results
+from app.models import RunnerContact, User, Race, Leaderboard, DatasetGeneration
+from data.load_db_excel import (scrape_all, append_results, iter_results,
+                                 bounded_map)
+from data.distances import resolve_distances
+from data.ingest_report import IngestReport
 
 
 def add_timestamp(timestamp):
@@ -40,11 +48,45 @@ def clean_column_names(df):
     return df
 
 
+# Substring of a nationality entry and what it is corrected to. Later
+# entries win when several match.
+NATIONALITY_CORRECTIONS = [
+    ('germa', 'german'), ('malaw', 'malawian'),
+    ('rsa', 'south african'), ('south africa', 'south african'),
+    ('zimba', 'zimbabwean'), ('america', 'united states'),
+    ('0', 'south african')
+]
+
+
 def lower_string_df(df):
-    return df.applymap(
-        lambda s: " ".join(s.lower().split())
-        if type(s) == str else s
-    )
+    """Lowercase strings and collapse runs of whitespace, column by column
+
+    Values that are not strings are left as they are.
+    """
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        # Object columns can hold only ints or bools, which .str rejects
+        is_str = df[col].map(type).eq(str)
+        if is_str.any():
+            df.loc[is_str, col] = (df.loc[is_str, col].str.lower()
+                                   .str.replace(r'\s+', ' ', regex=True)
+                                   .str.strip())
+    return df
+
+
+def clean_nationality(nationality: pd.Series) -> pd.Series:
+    """Correct nationality spellings, working on the distinct values only"""
+    uniques = pd.Series(nationality.dropna().unique(), dtype=object)
+    corrections = NATIONALITY_CORRECTIONS[::-1]
+    fixed = pd.Series(np.select(
+        [uniques.str.contains(prefix, regex=False)
+         for prefix, _ in corrections],
+        [cor for _, cor in corrections],
+        default=uniques
+    ), dtype=object)
+    # Some nationality entries contain dates
+    fixed[fixed.str.contains(r'\d')] = np.nan
+    return nationality.map(dict(zip(uniques, fixed)))
 
 
 def create_id_col(df):
@@ -69,20 +111,7 @@ def make_runnercontact_df(df: pd.DataFrame):
         | df.identification_code.duplicated(keep=False)]
     df = df.drop(dups_df.index)
 
-    # Clean up nationality codes
-    corrections = [
-        ('germa', 'german'), ('malaw', 'malawian'),
-        ('rsa', 'south african'), ('south africa', 'south african'),
-        ('zimba', 'zimbabwean'), ('america', 'united states'),
-        ('0', 'south african')
-    ]
-
-    for prefix, cor in corrections:
-        df.loc[df.nationality.str.contains(prefix), 'nationality'] = cor
-
-    # Some nationality entries contain dates
-    df.loc[df.nationality.apply(
-           lambda s: any(str.isdigit(c) for c in s)), 'nationality'] = np.NaN
+    df['nationality'] = clean_nationality(df['nationality'])
     df.rename(columns={'langauge': 'language'}, inplace=True)
 
     df.birthdate = pd.to_datetime(df.birthdate)
@@ -96,76 +125,17 @@ def make_runnercontact_df(df: pd.DataFrame):
     return df
 
 
-def fix_distances(problem_df: pd.DataFrame):
-    # Mainly needed for 2019 races
-    df = problem_df.copy(deep=True)
-
-    def extract_and_replace(some_string: str):
-        df.distance_km.loc[df.distance_km == some_string] = \
-            df.race.loc[df.distance_km == some_string] \
-            .str.extract(r'(\d{1,2}km)', expand=False)
-
-    str_list = ['sheet1', 'results', 'wpa']
-    for s in str_list:
-        extract_and_replace(s)
-
-    df.distance_km.loc[df.distance_km == '1o'] = '10'
-
-    names = df.loc[df.distance_km == 'sheet2'].name.values
-    if names.size > 0:
-        def replace_wpa_walking(name: str, val: str):
-            df.distance_km.loc[
-                np.logical_and(df.name == name,
-                               df.distance_km == 'sheet2')] = val
-
-        rep_list = [
-            (names[0], '10'), (names[1], '5'), (names[2], '3'),
-            (names[3], '3'), (names[4], '3'), (names[5], '3'),
-            (names[6], '1'), (names[7], '1')
-        ]
-
-        for name, val in rep_list:
-            replace_wpa_walking(name, val)
-
-    # Knysna forest
-    df.distance_km.loc[
-        np.logical_and(df.name == 'Bernard Rukadza',
-                       df.distance_km == '')] = '42'
-    df.distance_km.loc[df.distance_km == ''] = '21'
-
-    def replace_missing_race(name, val):
-        df.distance_km.loc[
-            df.race == name
-        ] = val
-
-    repl_list = [
-        ('avbobresults2019_wpa_fullresults', '15'),
-        ('fnb122019fullresultsupdate_sheet1', '12'),
-        ('satoricamelrunresults-05sep19_results', '16')
-    ]
-
-    for name, val in repl_list:
-        replace_missing_race(name, val)
-
-    df.distance_km = df.distance_km.str.split('.').str[0]
-    df.distance_km = df.distance_km.str.split('km').str[0]
-
-    df.distance_km = df.distance_km.astype(int)
-    bins = [1, 5, 10, 21, 42, 50, 100]
-    df['distance_cat'] = pd.cut(df.distance_km, bins, include_lowest=True)
-    df.distance_cat = df.distance_cat.astype(str)
-    return df
+def fix_distances(problem_df: pd.DataFrame, rules: dict=None):
+    """Resolve distance_km and distance_cat with the rules in
+    data/distance_rules.json"""
+    return resolve_distances(problem_df, rules)
 
 
-def create_race_table(scrape: bool=False, year: int=None):
-    if scrape:
-        scrape_all(year=year)
-    df = append_results(year=year)
+def clean_race_df(df: pd.DataFrame, year: int=None) -> pd.DataFrame:
     df = lower_string_df(df)
     df.sex = df.sex.replace({'m': 'male'})
     df.sex = df.sex.replace({'f': 'female'})
     df = df.replace({pd.NaT: None})
-    df['distance_km'] = df['race'].apply(lambda x: x.split('_')[1].split('k')[0])
     df['race_year'] = datetime.datetime.now().year if year is None else year
     df.lic_no = df.lic_no.fillna(np.nan)
     df['lic_no'] = df['lic_no'].astype(str).apply(lambda x: x.split('.')[0])
@@ -176,6 +146,32 @@ def create_race_table(scrape: bool=False, year: int=None):
     return df
 
 
+def create_race_table(scrape: bool=False, year: int=None, workers: int=1):
+    if scrape:
+        scrape_all(year=year)
+    df = append_results(year=year, workers=workers)
+    return clean_race_df(df, year)
+
+
+def iter_race_tables(scrape: bool=False, year: int=None, workers: int=1,
+                     report: IngestReport=None):
+    """Yield cleaned races with distances one workbook at a time"""
+    if report is None:
+        report = IngestReport()
+    if scrape:
+        scrape_all(year=year, report=report)
+    for df in iter_results(year=year, workers=workers, report=report):
+        with report.stage('clean') as stage:
+            stage.rows_in += len(df)
+            df = clean_race_df(df, year)
+            stage.rows_out += len(df)
+        with report.stage('fix_distances') as stage:
+            stage.rows_in += len(df)
+            df = fix_distances(df)
+            stage.rows_out += len(df)
+        yield df
+
+
 def add_user(email: str, name: str, password: str):
     new_user = User(
         email=email,
@@ -190,57 +186,357 @@ def add_user(email: str, name: str, password: str):
     db.session.commit()
 
 
-def load_df_orm(df, table):
+def load_df_orm(df, table, refresh: bool=True, report: IngestReport=None):
     """Load table into SQL using ORM
 
     Arguments:
         df {pd.DataFrame} -- DataFrame matching the
             schema of the table class
         table {db.Model} -- the ORM model class
+        refresh {bool} -- refresh the tables derived from table afterwards
+        report {IngestReport} -- records rows rejected by constraints
     """
-    for _, row in df.iterrows():
-        runner = table(**row.to_dict())
-        try:
-            db.session.add(runner)
-            db.session.flush()
-        except IntegrityError:
-            db.session.rollback()
-    db.session.commit()
+    if report is None:
+        report = IngestReport()
+    violations = Counter()
+    with report.stage('load') as stage:
+        stage.rows_in += len(df)
+        for _, row in df.iterrows():
+            record = row.to_dict()
+            runner = table(**record)
+            try:
+                # A savepoint per row, so a duplicate only rolls back
+                # itself and not the rows flushed before it
+                with db.session.begin_nested():
+                    db.session.add(runner)
+                stage.rows_out += 1
+            except IntegrityError as e:
+                source = record.get('race', table.__tablename__)
+                violations[source, str(e.orig).splitlines()[0]] += 1
+        if refresh:
+            after_load(table)
+        db.session.commit()
+    for (source, detail), rows in violations.items():
+        report.reject('load', 'constraint_violation', source, rows=rows,
+                      detail=detail)
+
+
+def after_load(table):
+    if table is Race:
+        Leaderboard.refresh()
+    DatasetGeneration.bump()
+
+
+def bulk_load_df(df, table, batch_size: int=1000, refresh: bool=True,
+                 report: IngestReport=None):
+    """Load table into SQL with batched INSERT ... ON CONFLICT DO NOTHING
+
+    Rows that clash with a unique constraint are skipped by Postgres
+    instead of costing a flush and a rollback each.
 
+    Arguments:
+        df {pd.DataFrame} -- DataFrame matching the
+            schema of the table class
+        table {db.Model} -- the ORM model class
+        refresh {bool} -- refresh the tables derived from table afterwards
+        report {IngestReport} -- records rows skipped on conflict
 
-def combine_race_years():
-    race_df_list = []
+    Returns:
+        (int, int) -- number of rows inserted and skipped
+    """
+    if report is None:
+        report = IngestReport()
+    with report.stage('load') as stage:
+        records = df.replace({np.nan: None, pd.NaT: None}).to_dict('records')
+        stage.rows_in += len(records)
+        inserted = 0
+        for i in range(0, len(records), batch_size):
+            batch = records[i:i + batch_size]
+            stmt = insert(table.__table__).values(batch).on_conflict_do_nothing()
+            inserted += db.session.execute(stmt).rowcount
+        if refresh:
+            after_load(table)
+        db.session.commit()
+        stage.rows_out += inserted
+    skipped = len(records) - inserted
+    if skipped:
+        report.reject('load', 'conflict_skipped', table.__tablename__,
+                      rows=skipped)
+    print(f'{table.__tablename__}: inserted {inserted} rows,'
+          f' skipped {skipped} existing rows')
+    return inserted, skipped
+
+
+def load_frames(frames, table, load_df=load_df_orm,
+                report: IngestReport=None) -> int:
+    """Load DataFrames one at a time as they are produced
+
+    The leaderboard and dataset generation are refreshed once at the
+    end rather than after every frame, and not at all when there was
+    nothing to load.
+    """
+    if report is None:
+        report = IngestReport()
+    rows = 0
+    for df in frames:
+        if df.empty:
+            continue
+        load_df(df, table, refresh=False, report=report)
+        rows += len(df)
+    if rows:
+        with report.stage('refresh'):
+            after_load(table)
+            db.session.commit()
+    return rows
 
-    for year in [2019, 2020]:
-        race_df = create_race_table(year=year)
-        race_df = fix_distances(race_df)
-        race_df_list.append(race_df)
 
-    return race_df_list
+CONTACT_KEY = ['firstname', 'secondname', 'surname', 'identification_code']
 
 
-if __name__ == '__main__':
+def contact_hashes(df: pd.DataFrame) -> pd.Series:
+    """Hex hash of each row's content, stable between runs"""
+    cols = sorted(c for c in df.columns if c not in ('id', 'content_hash'))
+    hashes = pd.util.hash_pandas_object(df[cols], index=False)
+    return hashes.map('{:016x}'.format)
+
+
+def contact_key_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # NULL and '' are the same name part when matching contacts
+    return df[CONTACT_KEY].astype(object).where(df[CONTACT_KEY].notna(), '')
+
+
+def sync_runner_contacts(df: pd.DataFrame, batch_size: int=1000,
+                         report: IngestReport=None) -> tuple:
+    """Insert new contacts and update changed ones, leaving the rest alone
+
+    Each exported row is hashed and matched to the stored contacts on
+    CONTACT_KEY, fetched with their hashes in one query. Only new rows
+    are inserted and only rows whose hash differs are updated, both in
+    batches. Contacts stored before hashes were kept have no hash, so
+    the first sync updates them once.
+
+    Arguments:
+        df {pd.DataFrame} -- contacts from make_runnercontact_df
+
+    Returns:
+        (int, int, int) -- number of contacts inserted, updated and
+            unchanged
+    """
+    if report is None:
+        report = IngestReport()
+    with report.stage('sync_contacts') as stage:
+        stage.rows_in += len(df)
+        df = df.assign(content_hash=contact_hashes(df))
+        stored = pd.DataFrame(
+            db.session.query(RunnerContact.id, RunnerContact.content_hash,
+                             *[getattr(RunnerContact, c) for c in CONTACT_KEY])
+            .all(),
+            columns=['id', 'stored_hash'] + CONTACT_KEY
+        )
+        matched = contact_key_frame(df).merge(
+            contact_key_frame(stored).assign(id=stored['id'],
+                                             stored_hash=stored['stored_hash'])
+            .drop_duplicates(CONTACT_KEY),
+            on=CONTACT_KEY, how='left'
+        )
+        stored_id = matched['id'].to_numpy()
+        stored_hash = matched['stored_hash'].to_numpy()
+        new = pd.isna(stored_id)
+        changed = ~new & (stored_hash != df['content_hash'].to_numpy())
+
+        records = df.replace({np.nan: None, pd.NaT: None})
+        inserts = records[new].to_dict('records')
+        for i in range(0, len(inserts), batch_size):
+            stmt = (insert(RunnerContact.__table__)
+                    .values(inserts[i:i + batch_size])
+                    .on_conflict_do_nothing())
+            db.session.execute(stmt)
+
+        updates = records[changed].assign(id=stored_id[changed].astype(int))
+        updates = updates.to_dict('records')
+        for i in range(0, len(updates), batch_size):
+            db.session.bulk_update_mappings(RunnerContact,
+                                            updates[i:i + batch_size])
+
+        if inserts or updates:
+            after_load(RunnerContact)
+        db.session.commit()
+        stage.rows_out += len(inserts) + len(updates)
+    unchanged = len(df) - len(inserts) - len(updates)
+    print(f'runner_contact: inserted {len(inserts)}, updated {len(updates)},'
+          f' {unchanged} unchanged')
+    return len(inserts), len(updates), unchanged
+
+
+def race_keys(df: pd.DataFrame) -> list:
+    """(name, race, seconds) tuples matching the race unique constraint"""
+    seconds = pd.to_timedelta(df['time']).dt.total_seconds()
+    return list(zip(df['name'], df['race'], seconds))
+
+
+def existing_race_keys(race_year: int) -> set:
+    rows = (db.session.query(Race.name, Race.race, Race.time)
+            .filter(Race.race_year == int(race_year))
+            .all())
+    return set(race_keys(pd.DataFrame(rows, columns=['name', 'race', 'time'])))
+
+
+def drop_existing_races(frames, report: IngestReport=None):
+    """Drop races already loaded, before they reach the database
+
+    The (name, race, time) keys of each race_year are fetched in one
+    query the first time the year is seen and every incoming row is
+    looked up in that set, which also catches repeats across frames.
+    Rows without a time are kept, as NULL never clashes with the
+    unique constraint.
+    """
+    if report is None:
+        report = IngestReport()
+    years = set()
+    existing = set()
+    for df in frames:
+        with report.stage('dedup') as stage:
+            stage.rows_in += len(df)
+            for year in set(df['race_year'].unique()) - years:
+                existing |= existing_race_keys(year)
+                years.add(year)
+            keep = df['time'].isna().to_numpy(dtype=bool, copy=True)
+            for i, key in enumerate(race_keys(df)):
+                if keep[i]:
+                    continue
+                keep[i] = key not in existing
+                existing.add(key)
+            stage.rows_out += int(keep.sum())
+        for race, rows in df.loc[~keep, 'race'].value_counts().items():
+            report.reject('dedup', 'already_loaded', race, rows=rows)
+        yield df[keep]
+
+
+def parse_years(spec: str) -> list:
+    """Years from a spec like '2019', '2012-2026' or '2016,2019-2020'
+
+    Raises argparse.ArgumentTypeError for a reversed range, so --years
+    never quietly falls back to --year.
+    """
+    years = []
+    for part in spec.split(','):
+        if '-' in part:
+            start, end = (int(year) for year in part.split('-'))
+            if start > end:
+                raise argparse.ArgumentTypeError(
+                    f'year range {part} is reversed')
+            years += list(range(start, end + 1))
+        else:
+            years.append(int(part))
+    return sorted(set(years))
+
+
+def build_year(year: int, scrape: bool=False) -> tuple:
+    """Scrape, parse and clean one year of races, timing it
+
+    Returns the year's races, the seconds taken and the year's report,
+    which a worker process sends back to be merged.
+    """
+    start = time.perf_counter()
+    report = IngestReport()
     try:
-        df = pd.read_csv('data/export.csv')
-        clean_df = make_runnercontact_df(df)
-        load_df_orm(clean_df, RunnerContact)
+        race_dfs = list(iter_race_tables(scrape=scrape, year=year,
+                                         report=report))
     except FileNotFoundError:
-        pass
-    app = create_app()
-    app.app_context().push()
+        print(f'No race downloads found for {year}. Skipping')
+        race_dfs = []
+    race_df = pd.concat(race_dfs, ignore_index=True) if race_dfs else None
+    return race_df, time.perf_counter() - start, report
+
+
+def print_year(year: int, rows: int, seconds: float):
+    rate = rows / seconds if seconds else 0
+    print(f'{year}  {rows:>5}  {seconds:>8.1f}  {rate:>7.1f}')
 
+
+def iter_race_years(years: list=None, workers: int=1, scrape: bool=False,
+                    report: IngestReport=None):
+    """Yield cleaned races for several years, printing rows/s per year
+
+    With one worker each year is streamed a workbook at a time. With
+    more, whole years are built in parallel processes and yielded in
+    order, with at most workers years finished and waiting to load.
+    """
+    if years is None:
+        years = [2019, 2020]
+    if report is None:
+        report = IngestReport()
+
+    print('\nyear   rows   seconds   rows/s')
+    if workers == 1:
+        for year in years:
+            start = time.perf_counter()
+            rows = 0
+            try:
+                for race_df in iter_race_tables(scrape=scrape, year=year,
+                                                report=report):
+                    rows += len(race_df)
+                    yield race_df
+            except FileNotFoundError:
+                print(f'No race downloads found for {year}. Skipping')
+            print_year(year, rows, time.perf_counter() - start)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            build = partial(build_year, scrape=scrape)
+            for year, (race_df, seconds, year_report) in bounded_map(
+                    pool, build, years, workers):
+                report.merge(year_report)
+                rows = 0 if race_df is None else len(race_df)
+                print_year(year, rows, seconds)
+                if race_df is not None:
+                    yield race_df
+
+
+if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Find races for a certain year')
-    parser.add_argument('--year', type=int,
-                        default=2020, help='Find races for a given year')
+    years = parser.add_mutually_exclusive_group()
+    years.add_argument('--year', type=int,
+                       default=2020, help='Find races for a given year')
+    years.add_argument('--years', type=parse_years,
+                       help='Find races for a range of years, e.g. 2012-2026')
     # Calling --scrape will be True.
     parser.add_argument('--scrape', action='store_true')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes used to build years in'
+                             ' parallel with --years, or to parse workbooks')
+    parser.add_argument('--bulk', action='store_true',
+                        help='Load rows in batches with ON CONFLICT DO NOTHING'
+                             ' (always on with --years)')
+    parser.add_argument('--report', type=Path,
+                        help='Write a JSON report of stage timings and'
+                             ' rejected rows to this path')
     args = parser.parse_args()
+    report = IngestReport()
+    # A range of years is one large load, so it is always batched
+    load_df = bulk_load_df if args.bulk or args.years else load_df_orm
+
+    app = create_app()
+    app.app_context().push()
+
+    try:
+        df = pd.read_csv('data/export.csv')
+        clean_df = make_runnercontact_df(df)
+        sync_runner_contacts(clean_df, report=report)
+    except FileNotFoundError:
+        pass
+
+    if args.years:
+        race_dfs = iter_race_years(args.years, workers=args.workers,
+                                   scrape=args.scrape, report=report)
+    else:
+        race_dfs = iter_race_tables(scrape=args.scrape, year=args.year,
+                                    workers=args.workers, report=report)
 
-    race_df = create_race_table(scrape=args.scrape, year=args.year)
-    race_df = fix_distances(race_df)
+    load_frames(drop_existing_races(race_dfs, report), Race, load_df,
+                report=report)
+    if args.report:
+        report.write(args.report)
 
-    load_df_orm(race_df, Race)
-    
     add_user(email=os.getenv('ADMIN_EMAIL', 'gugs@gmail.com'),
              name=os.getenv('ADMIN_NAME', 'gugs_user'),
              password=os.getenv('ADMIN_PASSWORD', 'foobar'))
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+import pickle
+import gzip
+from pathlib import Path
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ParseCache:
+    """Extracted race sheets stored by workbook content hash
+
+    Entries are gzipped pickles named after the sha256 of the workbook
+    and the parser version, so a changed file or a parser change is a
+    cache miss. Pickle is used rather than Parquet because sheets come
+    straight from Excel with mixed-type object columns.
+
+    manifest.json maps each workbook path to its size, mtime and hash,
+    so unchanged files are not even re-hashed. Years ingested in
+    parallel share it, so it is merged with what is on disk and replaced
+    whole when saved, and an unreadable one only costs re-hashing.
+    """
+
+    def __init__(self, cache_dir: Path, parser_version: str):
+        self.cache_dir = Path(cache_dir)
+        self.parser_version = parser_version
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.cache_dir / 'manifest.json'
+        self.manifest = self.read_manifest()
+        self.hits = 0
+        self.misses = 0
+
+    def read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def digest(self, path: Path) -> str:
+        stat = path.stat()
+        entry = self.manifest.get(str(path))
+        if (entry and entry['size'] == stat.st_size
+                and entry['mtime'] == stat.st_mtime):
+            return entry['sha256']
+        sha256 = file_digest(path)
+        self.manifest[str(path)] = {'size': stat.st_size,
+                                    'mtime': stat.st_mtime,
+                                    'sha256': sha256}
+        return sha256
+
+    def entry_path(self, path: Path) -> Path:
+        return self.cache_dir / f'{self.digest(path)}-{self.parser_version}.pkl.gz'
+
+    def get(self, path: Path):
+        entry = self.entry_path(path)
+        if not entry.exists():
+            self.misses += 1
+            return None
+        self.hits += 1
+        with gzip.open(entry, 'rb') as f:
+            return pickle.load(f)
+
+    def put(self, path: Path, sheets: list) -> None:
+        entry = self.entry_path(path)
+        tmp = entry.with_suffix('.tmp')
+        with gzip.open(tmp, 'wb') as f:
+            pickle.dump(sheets, f)
+        tmp.replace(entry)
+
+    def save_manifest(self) -> None:
+        # Keep entries other processes saved since this one read it
+        self.manifest = {**self.read_manifest(), **self.manifest}
+        tmp = self.manifest_path.with_name(f'manifest.{os.getpid()}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=1)
+        tmp.replace(self.manifest_path)
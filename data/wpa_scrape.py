@@ -56,7 +56,8 @@ def main(month: int=None,
          year: int=None,
          download_path: Path=None,
          url: str="http://wpa.myactiveweb.co.za/calendar/dynamicevents.aspx",
-         max_attempts: int=5):
+         max_attempts: int=5,
+         report=None):
     current_month = datetime.datetime.now().month
 
     if month is None:
@@ -110,6 +111,7 @@ def main(month: int=None,
     time.sleep(5)
 
     excel_list = []
+    saved = []
     div = browser.find_elements(By.TAG_NAME, 'a')
     for link in tqdm(div):
         for _ in range(max_attempts):
@@ -125,8 +127,15 @@ def main(month: int=None,
                 print(f'Downloading {item_name}')
                 excel_list.append(item)
                 resp = requests.get(item)
+                if not resp.ok:
+                    print(f'Could not download {item_name}: {resp.status_code}')
+                    if report is not None:
+                        report.reject('scrape', 'download_failed', item_name,
+                                      rows=0, detail=str(resp.status_code))
+                    continue
                 with open(download_path / item_name, 'wb') as output:
                     output.write(resp.content)
+                saved.append(download_path / item_name)
     if not excel_list:
         print(f'No road races found for '
               f'{month_name} {current_year}\n')
@@ -134,6 +143,7 @@ def main(month: int=None,
     print(f'\nRace files saved to {download_path}')
     print(f'Finished in {datetime.timedelta(seconds=time.time()-start)}')
     browser.quit()
+    return saved
 
 
 if __name__ == '__main__':
@@ -0,0 +1,43 @@
+"""Add trigram GiST indexes for ranked name search
+
+Revision ID: a7c4e2b8d053
+Revises: 5e9a0f3c6d12
+Create Date: 2026-10-18 12:40:52.106338
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c4e2b8d053'
+down_revision = '5e9a0f3c6d12'
+branch_labels = None
+depends_on = None
+
+# Must match the RunnerContact.fullname expression in app/models.py
+FULLNAME = (
+    "(coalesce(firstname, '') || ' ' || coalesce(secondname, '')"
+    " || ' ' || coalesce(surname, ''))"
+)
+
+# GIN cannot order by the <-> distance operator, GiST can
+INDEXES = [
+    ('ix_race_name_trgm_gist', 'race', 'name'),
+    ('ix_runner_contact_fullname_trgm_gist', 'runner_contact', FULLNAME),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, expr in INDEXES:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}'
+                f' ON {table} USING gist ({expr} gist_trgm_ops)'
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,45 @@
+"""Add trigram indexes for fuzzy name and race lookups
+
+Revision ID: d41b7c3e9f20
+Revises: 8f1c2d9a4b7e
+Create Date: 2026-10-18 10:03:27.904113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41b7c3e9f20'
+down_revision = '8f1c2d9a4b7e'
+branch_labels = None
+depends_on = None
+
+# Must match the RunnerContact.fullname expression in app/models.py
+FULLNAME = (
+    "(coalesce(firstname, '') || ' ' || coalesce(secondname, '')"
+    " || ' ' || coalesce(surname, ''))"
+)
+
+INDEXES = [
+    ('ix_race_name_trgm', 'race', 'name'),
+    ('ix_race_race_trgm', 'race', 'race'),
+    ('ix_runner_contact_fullname_trgm', 'runner_contact', FULLNAME),
+]
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, expr in INDEXES:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}'
+                f' ON {table} USING gin ({expr} gin_trgm_ops)'
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,49 @@
+import json
+import sys
+import types
+
+from app.cache import LocalCache, RedisCache, normalize
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    @classmethod
+    def from_url(cls, url):
+        return cls()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+
+def test_local_cache_lru_and_ttl():
+    cache = LocalCache(maxsize=2)
+    cache.set('a', 'page a', ttl=60)
+    cache.set('b', 'page b', ttl=60)
+    assert cache.get('a') == 'page a'
+    cache.set('c', 'page c', ttl=60)
+    assert cache.get('b') is None
+    assert cache.get('a') == 'page a'
+
+    cache.set('expired', 'old page', ttl=-1)
+    assert cache.get('expired') is None
+
+
+def test_normalize_search_input():
+    assert normalize('  Joe   SMITH ') == 'joe smith'
+    assert normalize(10) == 10
+
+
+def test_redis_cache_stores_json(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'redis',
+                        types.SimpleNamespace(Redis=FakeRedis))
+    cache = RedisCache('redis://localhost:6379/0')
+    cache.set('predict', ['Results for joe smith', '10 km: 0:45:00'], ttl=60)
+    stored = cache.client.data['gugs_db:predict']
+    assert json.loads(stored) == ['Results for joe smith', '10 km: 0:45:00']
+    assert cache.get('predict') == ['Results for joe smith', '10 km: 0:45:00']
+    assert cache.get('missing') is None
@@ -1,5 +1,11 @@
+import datetime
+
+import pandas as pd
 from werkzeug.security import check_password_hash
-from app.models import User
+from app.models import User, Race, RunnerContact
+from data.ingest_report import IngestReport
+from data.load_data import (drop_existing_races, bulk_load_df, load_df_orm,
+                            sync_runner_contacts)
 
 
 def test_new_user(new_user):
@@ -14,3 +20,58 @@ def test_db(new_user, init_database):
     assert (
         init_database.session.query(User).first().password == new_user.password
     )
+
+
+def test_reingest_drops_loaded_races(init_database, race_data):
+    _, race_df = race_data
+    new_df, = drop_existing_races([race_df])
+    # Only rows without a time, which never clash, are sent again
+    assert new_df['time'].notna().sum() == 0
+
+
+def race_rows(race, names, minutes):
+    n = len(names)
+    return pd.DataFrame({
+        'pos': range(1, n + 1), 'name': names, 'race': [race] * n,
+        'time': [datetime.timedelta(minutes=m) for m in minutes],
+        'sex': ['male'] * n, 'age': [30] * n, 'cat': ['sen'] * n,
+        'lic_no': [str(i) for i in range(n)], 'distance_km': [10] * n,
+        'race_year': [2020] * n, 'distance_cat': ['(5.0, 10.0]'] * n,
+    })
+
+
+def test_bulk_load_df_skips_existing(init_database):
+    df = race_rows('bulktest_10km', ['bulk one', 'bulk two'], [40, 45])
+    assert bulk_load_df(df, Race) == (2, 0)
+    # A re-run is skipped by ON CONFLICT instead of adding duplicates
+    assert bulk_load_df(df, Race) == (0, 2)
+    assert Race.query.filter_by(race='bulktest_10km').count() == 2
+
+
+def test_sync_runner_contacts(init_database):
+    df = pd.DataFrame({
+        'firstname': ['sync', 'sync'], 'secondname': [None, None],
+        'surname': ['one', 'two'], 'identification_code': ['1', '2'],
+        'email': ['one@example.com', 'two@example.com'],
+    })
+    assert sync_runner_contacts(df) == (2, 0, 0)
+
+    df.loc[1, 'email'] = 'second@example.com'
+    df.loc[2] = ['sync', None, 'three', '3', 'three@example.com']
+    assert sync_runner_contacts(df) == (1, 1, 1)
+    assert (RunnerContact.query.filter_by(surname='two').one().email
+            == 'second@example.com')
+    assert RunnerContact.query.filter_by(firstname='sync').count() == 3
+
+
+def test_load_df_orm_keeps_rows_before_a_duplicate(init_database):
+    df = race_rows('ormtest_10km', ['orm one', 'orm two'], [40, 45])
+    load_df_orm(df, Race)
+
+    report = IngestReport()
+    rerun = race_rows('ormtest_10km', ['orm three', 'orm one', 'orm four'],
+                      [38, 40, 50])
+    load_df_orm(rerun, Race, report=report)
+    assert Race.query.filter_by(race='ormtest_10km').count() == 4
+    assert report.stages['load'].rows_out == 2
+    assert report.rejected_by_reason() == {'constraint_violation': 1}
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from data.distances import resolve_distances, load_rules
+
+
+def test_resolve_distances():
+    df = pd.DataFrame({
+        'name': ['joe smith', 'joe smith', 'jane doe', 'jane doe',
+                 'bernard rukadza', 'jane doe'],
+        'race': ['bellville_15km', 'peninsula_42.2km', 'fnb12km_sheet1',
+                 'someraceresults_1o', 'knysnaforest_knysna',
+                 'avbobresults2019_wpa_fullresults'],
+        'race_year': [2020, 2020, 2020, 2020, 2019, 2019],
+    })
+    df = resolve_distances(df)
+    assert df.distance_km.tolist() == [15, 42, 12, 10, 42, 15]
+    assert df.distance_cat.tolist()[:2] == ['(10.0, 21.0]', '(21.0, 42.0]']
+
+
+def test_resolve_distances_default():
+    df = pd.DataFrame({'name': ['jane doe'], 'race': ['mysteryrace_results'],
+                       'race_year': [2024]})
+    assert resolve_distances(df).distance_km.tolist() == [21]
+
+
+def test_resolve_distances_runner_overrides():
+    rules = load_rules()
+    rules['overrides'] += [
+        {'race': 'walking_sheet2', 'name': 'walker one', 'km': 10},
+        {'race': 'walking_sheet2', 'name': 'walker two', 'km': 5},
+    ]
+    df = pd.DataFrame({'name': ['walker two', 'walker one'],
+                       'race': ['walking_sheet2'] * 2,
+                       'race_year': [2019] * 2})
+    # Reordering or splitting the rows does not change their distances
+    assert resolve_distances(df, rules).distance_km.tolist() == [5, 10]
+    assert resolve_distances(df[1:], rules).distance_km.tolist() == [10]
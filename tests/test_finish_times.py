@@ -0,0 +1,49 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.finish_times import parse_times
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('01:02:03', '01:02:03'),
+    ('1:02:03', '01:02:03'),
+    ('45:12', '00:45:12'),
+    ('5:30', '00:05:30'),
+    ('01:02:03.123000', '01:02:03'),
+    ('1900-01-01 01:02:03', '01:02:03'),
+    ('1900-01-01 01:02:03.500000', '01:02:03'),
+    ('1.02.03', '01:02:03'),
+    ('25.30.00', '00:25:30'),
+    ('25.30', '00:25:30'),
+    ('5.30', '00:05:30'),
+    (datetime.time(1, 2, 3), '01:02:03'),
+    (datetime.datetime(1900, 1, 1, 1, 2, 3), '01:02:03'),
+    (datetime.timedelta(hours=1, minutes=2, seconds=3), '01:02:03'),
+    (datetime.timedelta(days=1, minutes=2, seconds=3), '1 days 00:02:03'),
+    (pd.Timedelta('0 days 01:02:03.5'), '01:02:03'),
+])
+def test_parse_times_formats(raw, expected):
+    times, n_unparsed = parse_times(pd.Series([raw], dtype=object))
+    assert times[0] == pd.Timedelta(expected)
+    assert n_unparsed == 0
+
+
+def test_parse_times_missing_and_unparsed():
+    raw = pd.Series(['Not started', '99:99:99', np.nan, 'DNF', '1:02:03'],
+                    dtype=object)
+    times, n_unparsed = parse_times(raw)
+    assert times[:4].isna().all()
+    assert times[4] == pd.Timedelta('01:02:03')
+    assert n_unparsed == 1
+
+
+def test_parse_times_excel_duration_cells():
+    # [h]:mm:ss cells are read as timedeltas, not times of day
+    times = pd.to_timedelta(['01:02:03', '00:45:12', '26:00:01'])
+    assert pd.Series(times).dtype.kind == 'm'
+    parsed, n_unparsed = parse_times(pd.Series(times))
+    assert parsed.to_list() == list(times)
+    assert n_unparsed == 0
@@ -0,0 +1,48 @@
+import sys
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'train'))
+from forecast_cache import ForecastCache
+
+
+def test_forecast_cache_lru(tmp_path):
+    cache = ForecastCache(maxsize=2, path=tmp_path / 'forecasts.pkl')
+    keys = [cache.key('Joe Smith', '(10.0, 21.0]', [60.0, 61.5 + i])
+            for i in range(3)]
+    assert cache.get(keys[0]) is None
+
+    for i, key in enumerate(keys):
+        cache.put(key, {'pred': [i]})
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == {'pred': [2]}
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+    reloaded = ForecastCache(maxsize=2, path=tmp_path / 'forecasts.pkl')
+    assert len(reloaded) == 2
+    assert reloaded.get(keys[1]) == {'pred': [1]}
+
+
+def test_forecast_cache_key_tracks_history():
+    key = ForecastCache.key('Joe Smith', '(10.0, 21.0]', [60.0, 61.5])
+    assert key == ForecastCache.key('joe smith', '(10.0, 21.0]', [60.0, 61.5])
+    assert key != ForecastCache.key('Joe Smith', '(10.0, 21.0]', [60.0, 62.0])
+
+
+def test_forecast_cache_save_failure_is_ignored(tmp_path):
+    # The cache file's directory cannot be created under a regular file
+    blocker = tmp_path / 'blocker'
+    blocker.write_text('')
+    cache = ForecastCache(path=blocker / 'forecasts.pkl')
+    key = cache.key('Joe Smith', '(10.0, 21.0]', [60.0, 61.5])
+    cache.put(key, {'pred': [1]})
+    assert cache.get(key) == {'pred': [1]}
+
+
+def test_forecast_cache_save_leaves_no_temp_files(tmp_path):
+    path = tmp_path / 'forecasts.pkl'
+    caches = [ForecastCache(path=path) for _ in range(2)]
+    for i, cache in enumerate(caches):
+        cache.put(cache.key('Joe Smith', '(10.0, 21.0]', [60.0 + i]),
+                  {'pred': [i]})
+    assert [p.name for p in tmp_path.iterdir()] == ['forecasts.pkl']
@@ -0,0 +1,38 @@
+import json
+
+from data.ingest_report import IngestReport
+
+
+def test_stages_accumulate_and_merge():
+    report = IngestReport()
+    for rows in [10, 5]:
+        with report.stage('clean_time') as stage:
+            stage.rows_in += rows
+            stage.rows_out += rows - 1
+        report.reject('clean_time', 'unparseable_time', 'race_10km', rows=1)
+
+    worker_report = IngestReport()
+    with worker_report.stage('clean_time') as stage:
+        stage.rows_in += 3
+    worker_report.reject('find_race_sheets', 'empty_time_column',
+                         'race_21km', rows=20)
+    report.merge(worker_report)
+
+    stats = report.stages['clean_time']
+    assert (stats.calls, stats.rows_in, stats.rows_out) == (3, 18, 13)
+    assert report.rejected_by_reason() == {'unparseable_time': 2,
+                                           'empty_time_column': 20}
+
+
+def test_write_json_report(tmp_path):
+    report = IngestReport()
+    with report.stage('extract') as stage:
+        stage.bytes += 1024
+    report.reject('load', 'constraint_violation', 'race_10km', rows=4,
+                  detail='duplicate key value violates unique constraint')
+    report.write(tmp_path / 'report.json')
+
+    saved = json.loads((tmp_path / 'report.json').read_text())
+    assert saved['stages']['extract']['bytes'] == 1024
+    assert saved['rejected_rows'] == {'constraint_violation': 4}
+    assert saved['rejections'][0]['source'] == 'race_10km'
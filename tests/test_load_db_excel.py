@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.load_db_excel import (FrameReader, load_to_db_table,
+                                read_csv_results, find_race_sheets)
+
+
+def frames():
+    return [pd.DataFrame({'id': [1, 2], 'pos': [1.0, np.nan],
+                          'name': ['joe', 'ann']}),
+            pd.DataFrame({'id': [3], 'pos': [3.0], 'name': ['bob']})]
+
+
+@pytest.mark.parametrize('size', [-1, 1, 5, 1000])
+def test_frame_reader_reads_every_chunk(size):
+    reader = FrameReader(frames(), ['id', 'pos', 'name'])
+    text = ''
+    while True:
+        block = reader.read(size)
+        if not block:
+            break
+        assert size < 0 or len(block) <= size
+        text += block
+    assert text == '1,1,joe\n2,,ann\n3,3,bob\n'
+    assert reader.rows == 3
+
+
+def test_frame_reader_readline():
+    reader = FrameReader(frames(), ['name', 'pos'])
+    lines = list(iter(reader.readline, ''))
+    assert lines == ['joe,1\n', 'ann,\n', 'bob,3\n']
+
+
+@pytest.fixture
+def copy_table(init_database):
+    engine = init_database.engine
+    with engine.begin() as con:
+        con.execute('CREATE TABLE copy_test'
+                    ' (id integer PRIMARY KEY, pos integer, name text)')
+    yield engine
+    with engine.begin() as con:
+        con.execute('DROP TABLE copy_test')
+
+
+def table_rows(engine):
+    with engine.connect() as con:
+        return con.execute('SELECT id, pos, name FROM copy_test'
+                           ' ORDER BY id').fetchall()
+
+
+def test_load_to_db_table_modes(copy_table):
+    assert load_to_db_table(iter(frames()), copy_table, 'copy_test',
+                            mode='append') == 3
+
+    changed = pd.DataFrame({'id': [3, 4], 'pos': [30, 4],
+                            'name': ['bobby', 'sue']})
+    # Without conflict columns clashing rows are left as they are
+    load_to_db_table(changed, copy_table, 'copy_test', mode='upsert')
+    assert table_rows(copy_table)[2:] == [(3, 3, 'bob'), (4, 4, 'sue')]
+
+    load_to_db_table(changed, copy_table, 'copy_test', mode='upsert',
+                     conflict_cols=['id'])
+    assert table_rows(copy_table)[2:] == [(3, 30, 'bobby'), (4, 4, 'sue')]
+
+    load_to_db_table(changed, copy_table, 'copy_test', mode='replace')
+    assert len(table_rows(copy_table)) == 2
+
+
+def write_results(tmp_path, suffix, times, clubs):
+    sep = '\t' if suffix == '.tsv' else ','
+    lines = [sep.join(['Synthetic 10km', '', '', '']),
+             sep.join(['Pos', 'Name', 'Time', 'Club'])]
+    lines += [sep.join([str(i + 1), f'runner {i}', time, club])
+              for i, (time, club) in enumerate(zip(times, clubs))]
+    path = tmp_path / f'race{suffix}'
+    path.write_text('\n'.join(lines) + '\n')
+    return path
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.tsv'])
+def test_read_csv_results_drops_chunk_without_clubs(tmp_path, suffix):
+    # The first chunk has an all empty club column
+    path = write_results(tmp_path, suffix,
+                         times=['0:40:00', '0:41:00', '0:42:00', '0:43:00'],
+                         clubs=['', '', 'Other AC', 'RCS Gugulethu'])
+    (sheet, df), = read_csv_results(path, chunksize=2)
+    assert sheet == 'Sheet1'
+    assert df['Name'].to_list() == ['runner 3']
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.tsv'])
+def test_read_csv_results_empty_time_column(tmp_path, suffix):
+    # Club runners without times are kept while others have times
+    path = write_results(tmp_path, suffix, times=['0:40:00', ''],
+                         clubs=['Other AC', 'Gugs AC'])
+    (_, df), = read_csv_results(path, chunksize=1)
+    assert df['Name'].to_list() == ['runner 1']
+
+    path = write_results(tmp_path, suffix, times=['', ''],
+                         clubs=['Other AC', 'Gugs AC'])
+    assert read_csv_results(path, chunksize=1) == []
+
+
+def test_find_race_sheets_keeps_club_rows(tmp_path):
+    rows = [['Synthetic 10km', None, None, None],
+            ['Pos', 'Name', 'Time', 'Club'],
+            [1, 'runner 0', '0:40:00', 'RCS Gugulethu'],
+            [2, 'runner 1', '0:41:00', 'Other AC'],
+            [3, 'runner 2', '0:42:00', 'Gugs AC'],
+            ['Results by a timing company', None, None, None]]
+    path = tmp_path / 'race.xlsx'
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame(rows).to_excel(writer, sheet_name='10km',
+                                    header=False, index=False)
+        pd.DataFrame([['No results']]).to_excel(writer, sheet_name='notes',
+                                                header=False, index=False)
+    with pd.ExcelFile(path) as xl:
+        (sheet, df), = find_race_sheets(xl)
+    assert sheet == '10km'
+    assert df['Name'].to_list() == ['runner 0', 'runner 2']
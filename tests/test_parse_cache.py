@@ -0,0 +1,79 @@
+import json
+
+import pandas as pd
+
+from data import parse_cache
+from data.parse_cache import ParseCache
+
+
+def sheets():
+    return [('10km', pd.DataFrame({'Name': ['joe'], 'Time': ['0:45:00']}))]
+
+
+def workbook(tmp_path, content=b'results'):
+    path = tmp_path / 'race.xlsx'
+    path.write_bytes(content)
+    return path
+
+
+def test_put_get_round_trip(tmp_path):
+    path = workbook(tmp_path)
+    cache = ParseCache(tmp_path / 'cache', '1')
+    assert cache.get(path) is None
+    cache.put(path, sheets())
+    (sheet, df), = cache.get(path)
+    assert sheet == '10km'
+    assert df.equals(sheets()[0][1])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changed_workbook_misses(tmp_path):
+    path = workbook(tmp_path)
+    cache = ParseCache(tmp_path / 'cache', '1')
+    cache.put(path, sheets())
+    path.write_bytes(b'corrected results')
+    assert cache.get(path) is None
+
+
+def test_parser_version_bump_misses(tmp_path):
+    path = workbook(tmp_path)
+    ParseCache(tmp_path / 'cache', '1').put(path, sheets())
+    assert ParseCache(tmp_path / 'cache', '2').get(path) is None
+
+
+def test_manifest_persists(tmp_path, monkeypatch):
+    path = workbook(tmp_path)
+    cache = ParseCache(tmp_path / 'cache', '1')
+    cache.put(path, sheets())
+    cache.save_manifest()
+
+    def no_hashing(path):
+        raise AssertionError('unchanged workbook was hashed again')
+    monkeypatch.setattr(parse_cache, 'file_digest', no_hashing)
+    assert ParseCache(tmp_path / 'cache', '1').get(path) is not None
+
+
+def test_unreadable_manifest_is_empty(tmp_path):
+    path = workbook(tmp_path)
+    cache_dir = tmp_path / 'cache'
+    ParseCache(cache_dir, '1').put(path, sheets())
+    # e.g. cut short by another process writing it
+    (cache_dir / 'manifest.json').write_text('{"race.xlsx": {"si')
+    cache = ParseCache(cache_dir, '1')
+    assert cache.get(path) is not None
+    cache.save_manifest()
+    assert str(path) in json.loads((cache_dir / 'manifest.json').read_text())
+
+
+def test_save_manifest_keeps_other_processes_entries(tmp_path):
+    first, second = tmp_path / 'a', tmp_path / 'b'
+    first.mkdir()
+    second.mkdir()
+    caches = [ParseCache(tmp_path / 'cache', '1') for _ in range(2)]
+    for cache, folder in zip(caches, [first, second]):
+        cache.put(workbook(folder), sheets())
+    for cache in caches:
+        cache.save_manifest()
+    saved = json.loads((tmp_path / 'cache' / 'manifest.json').read_text())
+    assert set(saved) == {str(first / 'race.xlsx'), str(second / 'race.xlsx')}
+    assert not list((tmp_path / 'cache').glob('*.tmp'))
@@ -0,0 +1,36 @@
+import argparse
+
+import pytest
+
+from data.load_data import parse_years
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('2019', [2019]),
+    ('2012-2014', [2012, 2013, 2014]),
+    ('2020-2020', [2020]),
+    ('2019-2020,2016', [2016, 2019, 2020]),
+    ('2019,2018-2019', [2018, 2019]),
+])
+def test_parse_years(spec, expected):
+    assert parse_years(spec) == expected
+
+
+def test_parse_years_rejects_reversed_range():
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_years('2026-2012')
+
+
+@pytest.mark.parametrize('spec', ['', '2019,', '2019-', 'twenty'])
+def test_parse_years_rejects_bad_years(spec):
+    with pytest.raises(ValueError):
+        parse_years(spec)
+
+
+def test_years_argument_errors():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=parse_years)
+    assert parser.parse_args(['--years', '2012-2013']).years == [2012, 2013]
+    for spec in ['2026-2012', '']:
+        with pytest.raises(SystemExit):
+            parser.parse_args(['--years', spec])
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from data.load_data import lower_string_df, clean_nationality, contact_hashes
+
+
+def test_lower_string_df_leaves_other_values():
+    df = pd.DataFrame({'name': ['  Joe   SMITH ', 3, None], 'n': [1, 2, 3]})
+    cleaned = lower_string_df(df)
+    assert cleaned['name'].to_list() == ['joe smith', 3, None]
+    assert cleaned['n'].to_list() == [1, 2, 3]
+
+
+def test_lower_string_df_object_columns_without_strings():
+    # e.g. pos after remove_footer, medical_aid from export.csv
+    df = pd.DataFrame({'pos': pd.Series([1, 2], dtype=object),
+                       'medical_aid': pd.Series([True, False], dtype=object),
+                       'name': pd.Series(['A  B', 'c'], dtype=object)})
+    cleaned = lower_string_df(df)
+    assert cleaned['pos'].to_list() == [1, 2]
+    assert cleaned['medical_aid'].to_list() == [True, False]
+    assert cleaned['name'].to_list() == ['a b', 'c']
+
+
+def test_clean_nationality():
+    nationality = pd.Series(['germany', 'rsa', 'south africa', 'american',
+                             'kenyan', '12/5/1999', np.nan])
+    assert clean_nationality(nationality).to_list()[:5] == [
+        'german', 'south african', 'south african', 'united states', 'kenyan'
+    ]
+    assert clean_nationality(nationality)[5:].isna().all()
+
+
+def test_contact_hashes_change_with_content():
+    df = pd.DataFrame({'firstname': ['joe', 'ann'], 'email': ['a', 'b']})
+    hashes = contact_hashes(df)
+    assert contact_hashes(df[['email', 'firstname']]).equals(hashes)
+    df.loc[1, 'email'] = 'c'
+    changed = contact_hashes(df)
+    assert changed[0] == hashes[0]
+    assert changed[1] != hashes[1]
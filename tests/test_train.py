@@ -0,0 +1,67 @@
+import sys
+from os.path import dirname, abspath, join
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'train'))
+import train
+from train import fit_task, forecast_tasks
+
+ROW_KEYS = {'name', 'distance_cat', 'n_races', 'history_hash', 'pred',
+            'conf_lower', 'conf_upper', 'model_order', 'fit_seconds'}
+
+
+def test_forecast_tasks_groups_by_runner_and_category():
+    race_df = pd.DataFrame({
+        'name': ['joe smith', 'ann lee', 'joe smith', 'joe smith'],
+        'distance_cat': ['(5.0, 10.0]', '(5.0, 10.0]', '(21.0, 42.0]',
+                         '(5.0, 10.0]'],
+        'time': pd.to_timedelta(['0:40:00', '0:50:00', '3:30:00',
+                                 '0:39:00']),
+    })
+    race_df.loc[2, 'time'] = pd.NaT
+    tasks = {(name, cat): list(minutes)
+             for name, cat, minutes in forecast_tasks(race_df)}
+    assert tasks == {('joe smith', '(5.0, 10.0]'): [40.0, 39.0],
+                     ('ann lee', '(5.0, 10.0]'): [50.0],
+                     ('joe smith', '(21.0, 42.0]'): []}
+    # Groups come out in the order they first appear
+    assert [task[:2] for task in forecast_tasks(race_df)][0] == (
+        'joe smith', '(5.0, 10.0]')
+
+
+def test_fit_task_row(monkeypatch):
+    monkeypatch.setattr(train, 'fit_forecast', lambda minutes: {
+        'pred': np.array([41.0]), 'conf_int': np.array([[39.0, 43.0]]),
+        'order': (0, 1, 0)})
+    row = fit_task(('joe smith', '(5.0, 10.0]', np.array([40.0, 42.0])))
+    assert set(row) == ROW_KEYS
+    assert row['n_races'] == 2
+    assert (row['pred'], row['conf_lower'], row['conf_upper']) == (
+        41.0, 39.0, 43.0)
+    assert row['model_order'] == '(0, 1, 0)'
+    assert row['fit_seconds'] >= 0
+
+
+def test_fit_task_needs_two_races(monkeypatch):
+    def no_fit(minutes):
+        raise AssertionError('a single race was fitted')
+    monkeypatch.setattr(train, 'fit_forecast', no_fit)
+    row = fit_task(('ann lee', '(5.0, 10.0]', np.array([50.0])))
+    assert set(row) == ROW_KEYS
+    assert row['n_races'] == 1
+    assert row['pred'] is None and row['fit_seconds'] is None
+
+
+@pytest.mark.parametrize('error', [ValueError, np.linalg.LinAlgError])
+def test_fit_task_failed_fit(monkeypatch, error):
+    def failing_fit(minutes):
+        raise error('no convergence')
+    monkeypatch.setattr(train, 'fit_forecast', failing_fit)
+    minutes = np.array([40.0, 42.0])
+    row = fit_task(('joe smith', '(5.0, 10.0]', minutes))
+    assert set(row) == ROW_KEYS
+    assert row['history_hash'] == train.series_fingerprint(minutes)
+    assert row['pred'] is None and row['model_order'] is None
@@ -1,3 +1,5 @@
+import json
+
 from bs4 import BeautifulSoup
 import pytest
 
@@ -62,3 +64,36 @@ def test_prediction(test_client, init_database, name):
     response = test_client.post('/predict', data=data, follow_redirects=True)
     assert response.status_code == 200
     assert str.encode('results for {}'.format(name.lower())) in response.data.lower() 
+
+
+@pytest.mark.parametrize('stream', [0, 1])
+def test_race_list_pages(test_client, init_database, stream):
+    response = test_client.get(f'/races?page_size=2&stream={stream}')
+    assert response.status_code == 200
+    soup = BeautifulSoup(response.data, 'html.parser')
+    rows = soup.findAll('table')[0].tbody.findAll('tr')
+    if stream:
+        assert len(rows) > 2
+    else:
+        assert len(rows) == 2
+        assert b'Next page' in response.data
+
+
+def test_export_races(test_client, init_database):
+    response = test_client.get('/api/races.ndjson?name=joe smith')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.data.splitlines()]
+    assert rows
+    assert all('joe smith' in row['name'].lower() for row in rows)
+
+
+def test_personal_bests(test_client, init_database):
+    response = test_client.get('/personal_bests?distance_cat=(21.0, 42.0]&n=5')
+    assert response.status_code == 200
+    soup = BeautifulSoup(response.data, 'html.parser')
+    rows = soup.findAll('table')[0].tbody.findAll('tr')
+    names = [row.findAll('td')[1].contents[0] for row in rows]
+    assert 0 < len(names) <= 5
+    # Only each runner's best time in the category is listed
+    assert len(set(names)) == len(names)
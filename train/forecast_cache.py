@@ -0,0 +1,101 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+
+def series_fingerprint(values) -> str:
+    """Hash a time series so a changed history gives a new cache key"""
+    arr = np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+    return hashlib.sha1(arr.tobytes()).hexdigest()
+
+
+class ForecastCache:
+    """LRU cache of ARIMA forecasts keyed by runner, category and history
+
+    Arguments:
+        maxsize {int} -- number of forecasts kept before the least
+            recently used one is evicted
+        path {str} -- optional pickle file the cache is loaded from and
+            saved to after every new forecast. Failed saves are printed
+            and otherwise ignored.
+    """
+
+    def __init__(self, maxsize: int=1024, path: str=None):
+        self.maxsize = maxsize
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    @staticmethod
+    def key(name: str, distance_cat: str, values, n_forecasts: int=1) -> tuple:
+        return (name.lower(), str(distance_cat), n_forecasts,
+                series_fingerprint(values))
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        if self.path is not None:
+            self.save()
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._data), 'maxsize': self.maxsize}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def load(self) -> None:
+        with open(self.path, 'rb') as f:
+            data = pickle.load(f)
+        with self._lock:
+            self._data = OrderedDict(list(data.items())[-self.maxsize:])
+
+    def save(self) -> None:
+        with self._lock:
+            data = OrderedDict(self._data)
+        # Every worker process saves to the same path, so each writes its
+        # own temporary file
+        tmp = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                pickle.dump(data, f)
+            tmp.replace(self.path)
+        except OSError as e:
+            # The forecast is still cached in memory, don't fail the request
+            print(f'Could not save forecast cache to {self.path}: {e}')
+
+    def __len__(self):
+        return len(self._data)
+
+
+FORECAST_CACHE = ForecastCache(
+    maxsize=int(os.getenv('FORECAST_CACHE_SIZE', '1024')),
+    path=os.getenv('FORECAST_CACHE_PATH')
+)
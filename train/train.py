@@ -3,17 +3,57 @@ import os
 sys.path.append(os.pardir)
 
 from typing import Callable
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import time
 import pmdarima as pm
 import datetime
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from fuzzywuzzy import process, fuzz
 from tqdm import tqdm
 # from sklearn.feature_extraction.text import TfidfVectorizer
 # from sklearn.metrics.pairwise import cosine_similarity
 
 from config import Config
+from app.models import DatasetGeneration
+from forecast_cache import ForecastCache, FORECAST_CACHE, series_fingerprint
+
+
+HISTORY_QUERY = text(
+    'SELECT name, time, distance_km, distance_cat, race_year FROM race'
+    " WHERE name ILIKE :pattern ESCAPE '\\' ORDER BY race_year, id"
+)
+
+
+STORED_FORECAST_QUERY = text(
+    'SELECT pred, conf_lower, conf_upper, model_order FROM prediction'
+    ' WHERE name = :name AND distance_cat = :distance_cat'
+    ' AND history_hash = :history_hash AND pred IS NOT NULL'
+)
+
+ALL_HISTORY_QUERY = text(
+    'SELECT name, time, distance_cat, race_year FROM race'
+    ' ORDER BY race_year, id'
+)
+
+
+def like_pattern(name: str) -> str:
+    escaped = (
+        name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    )
+    return f'%{escaped}%'
+
+
+def runner_history(name: str, con) -> pd.DataFrame:
+    """Fetch the race history of the runners matching name
+
+    Only the columns needed for prediction are selected, and the name
+    is matched case-insensitively with ILIKE.
+    """
+    return pd.read_sql(HISTORY_QUERY, con=con,
+                       params={'pattern': like_pattern(name)})
 
 
 def runner_groups(name: str, df: pd.DataFrame):
@@ -21,8 +61,43 @@ def runner_groups(name: str, df: pd.DataFrame):
     return runner_df.groupby('distance_cat')
 
 
-def predict_runner(name, df, n_forecasts=1):
-    runner_df = df.loc[df.name.str.contains(name, case=False)]
+def fit_forecast(minutes: np.ndarray, n_forecasts: int=1) -> dict:
+    try:
+        model = pm.auto_arima(
+            minutes, start_p=0, start_q=0,
+            seasonal=False, suppress_warnings=True
+        )
+    except IndexError:
+        # ARMA(p, q)
+        model = pm.auto_arima(
+            minutes, start_p=0, d=0, start_q=0,
+            max_d=0, seasonal=False, suppress_warnings=True
+        )
+    pred, conf_int = model.predict(n_forecasts, return_conf_int=True)
+    return {'pred': pred, 'conf_int': conf_int, 'order': model.order}
+
+
+def stored_forecast(name: str, distance_cat: str,
+                    minutes: np.ndarray, con) -> dict:
+    """Look up a precomputed forecast fitted on exactly this history"""
+    with con.connect() as conn:
+        row = conn.execute(STORED_FORECAST_QUERY, {
+            'name': name, 'distance_cat': distance_cat,
+            'history_hash': series_fingerprint(minutes)
+        }).first()
+    if row is None:
+        return None
+    return {'pred': np.array([row.pred]),
+            'conf_int': np.array([[row.conf_lower, row.conf_upper]]),
+            'order': row.model_order}
+
+
+def predict_runner(name, df=None, n_forecasts=1, con=None,
+                   cache: ForecastCache=FORECAST_CACHE):
+    if df is None:
+        runner_df = runner_history(name, con)
+    else:
+        runner_df = df.loc[df.name.str.contains(name, case=False)]
     n_runners = runner_df.name.nunique()
     pred_list = []
 
@@ -45,22 +120,20 @@ def predict_runner(name, df, n_forecasts=1):
         minutes = gp['time'].dropna().dt.seconds.values / 60.0
         len_minutes = len(minutes)
         if len_minutes > 1:
-            try:
-                model = pm.auto_arima(
-                    minutes, start_p=0, start_q=0,
-                    seasonal=False, suppress_warnings=True
-                )
-            except IndexError:
-                # ARMA(p, q)
-                model = pm.auto_arima(
-                    minutes, start_p=0, d=0, start_q=0,
-                    max_d=0, seasonal=False, suppress_warnings=True
-                )
+            key = cache.key(name, i, minutes, n_forecasts)
+            forecast = cache.get(key)
+            if forecast is None:
+                if con is not None and n_runners == 1 and n_forecasts == 1:
+                    forecast = stored_forecast(runner_df.name.iloc[0], i,
+                                               minutes, con)
+                if forecast is None:
+                    forecast = fit_forecast(minutes, n_forecasts)
+                cache.put(key, forecast)
             actual_distances = gp['distance_km'].tolist()
             print(f'Category {i} km has {len_minutes}'
                   f' race(s) of distance '
                   f'{", ".join(map(str, actual_distances))} km')
-            pred, conf_int = model.predict(n_forecasts, return_conf_int=True)
+            pred, conf_int = forecast['pred'], forecast['conf_int']
 
             def formatter(num):
                 return str(datetime.timedelta(minutes=num)).split('.')[0]
@@ -81,14 +154,69 @@ def predict_runner(name, df, n_forecasts=1):
     return pred_list
 
 
+def fit_task(task: tuple) -> dict:
+    name, distance_cat, minutes = task
+    row = {'name': name, 'distance_cat': distance_cat,
+           'n_races': len(minutes),
+           'history_hash': series_fingerprint(minutes),
+           'pred': None, 'conf_lower': None, 'conf_upper': None,
+           'model_order': None, 'fit_seconds': None}
+    if len(minutes) > 1:
+        start = time.perf_counter()
+        try:
+            forecast = fit_forecast(minutes)
+        except (ValueError, np.linalg.LinAlgError) as e:
+            print(f'Could not fit {name} in category {distance_cat}: {e}')
+            return row
+        row.update(pred=float(forecast['pred'][0]),
+                   conf_lower=float(forecast['conf_int'][0][0]),
+                   conf_upper=float(forecast['conf_int'][0][1]),
+                   model_order=str(forecast['order']),
+                   fit_seconds=time.perf_counter() - start)
+    return row
+
+
+def forecast_tasks(race_df: pd.DataFrame):
+    for (name, distance_cat), gp in race_df.groupby(['name', 'distance_cat'],
+                                                    sort=False):
+        minutes = gp['time'].dropna().dt.seconds.values / 60.0
+        yield name, distance_cat, minutes
+
+
+def batch_forecast(race_df: pd.DataFrame, workers: int=None,
+                   chunksize: int=8) -> pd.DataFrame:
+    """Fit every (runner, distance_cat) group across a process pool"""
+    n_tasks = race_df.groupby(['name', 'distance_cat']).ngroups
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = list(tqdm(pool.map(fit_task, forecast_tasks(race_df),
+                                  chunksize=chunksize),
+                         total=n_tasks, desc='Fitting forecasts'))
+    return pd.DataFrame(rows)
+
+
+def write_predictions(pred_df: pd.DataFrame, engine) -> None:
+    pred_df = pred_df.assign(created=datetime.datetime.now())
+    with engine.begin() as con:
+        con.execute(text('DELETE FROM prediction'))
+        pred_df.to_sql('prediction', con, if_exists='append', index=False)
+        # Cached /predict pages were rendered from the old predictions
+        DatasetGeneration.bump(con)
+
+
 if __name__ == '__main__':
-    engine = create_engine(Config.SQL_ALCHEMY_DATABASE_URI)
-    race_df = pd.read_sql_table('race', con=engine)
+    parser = argparse.ArgumentParser(
+        description='Precompute race time predictions for every runner')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of processes (default: all cores)')
+    parser.add_argument('--chunksize', type=int, default=8)
+    args = parser.parse_args()
 
-    for name in race_df.name.unique():
-        print(f'Predictions for {name}')
-        predict_runner(name, race_df)
+    engine = create_engine(Config.SQL_ALCHEMY_DATABASE_URI)
+    race_df = pd.read_sql(ALL_HISTORY_QUERY, con=engine)
 
-    # Now do a value count of the problem races
-    # There must be more than 2 races per runner for autoarima to work.
-    groups = runner_groups('lizo', race_df)
+    start = time.perf_counter()
+    pred_df = batch_forecast(race_df, workers=args.workers,
+                             chunksize=args.chunksize)
+    write_predictions(pred_df, engine)
+    print(f'Wrote {len(pred_df)} predictions in'
+          f' {datetime.timedelta(seconds=time.perf_counter() - start)}')